@@ -0,0 +1,127 @@
+"""
+Author: Ayush Bhandari
+Email: ayushbhandariofficial@gmail.com
+
+Benchmark GET /records end to end against a seeded google_sheet_data table. Requests go
+through FastAPI's TestClient, so they include routing, the database read and serialization,
+but not the network. The legacy handler (pandas DataFrame, response_model validation, json)
+is mounted next to the current one, at /legacy/records, so both read the same table:
+
+    legacy      the original handler
+    fast miss   current handler, cache cleared before every request
+    fast gzip   current handler, cache cleared, Accept-Encoding: gzip
+    fast hit    current handler, response served from the cache
+    fast 304    current handler, If-None-Match matches
+
+The table is TRUNCATEd and reseeded for every size, so this runs against its own database
+(created if missing), not POSTGRES_DB:
+
+    python -m benchmarks.records_api [--sizes 10000 100000 1000000] [--repeat 3] [--database superjoin_bench]
+"""
+import argparse
+import os
+import time
+
+
+def ensure_database(name):
+    from sqlalchemy import text
+    from src.postgresconnection.postgres_connection import get_postgres_engine
+    os.environ['POSTGRES_DB'] = 'postgres'
+    engine = get_postgres_engine().execution_options(isolation_level="AUTOCOMMIT")
+    with engine.connect() as connection:
+        exists = connection.execute(text("SELECT 1 FROM pg_database WHERE datname = :name"), {'name': name}).scalar()
+        if not exists:
+            connection.execute(text(f'CREATE DATABASE "{name}"'))
+    engine.dispose()
+    os.environ['POSTGRES_DB'] = name
+
+
+def seed(count):
+    from sqlalchemy import text
+    from src.utils.postgres_curd import get_engine
+    with get_engine().begin() as connection:
+        connection.execute(text("TRUNCATE google_sheet_data"))
+        connection.execute(text("""
+            INSERT INTO google_sheet_data
+            SELECT i, 'First' || i, 'Last' || i, (ARRAY['Open', 'Won', 'Lost'])[i % 3 + 1],
+                   (ARRAY['North', 'South', 'East', 'West'])[i % 4 + 1], 'Rep' || i % 50,
+                   'Call back next week', 'Notes for record ' || i,
+                   timestamp '2024-01-01' + i * interval '1 second'
+            FROM generate_series(1, :count) AS i
+        """), {'count': count})
+        connection.execute(text("ANALYZE google_sheet_data"))
+
+
+def make_app():
+    from typing import List
+    from fastapi import FastAPI
+    from src.datamodels.postgres_curd_model import Item
+    from src.routes import postgres_curd_endpoints
+    from src.utils.postgres_curd import fetch_postgres_data
+
+    app = FastAPI()
+    app.include_router(postgres_curd_endpoints.router)
+
+    # The handler as it was before the fast path
+    @app.get("/legacy/records", response_model=List[Item])
+    def get_legacy_records():
+        records = fetch_postgres_data()
+        if records.empty:
+            return []
+        return records.to_dict(orient="records")
+
+    return app
+
+
+def best_time(request, repeat, before=None):
+    timings = []
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        started = time.perf_counter()
+        response = request()
+        timings.append(time.perf_counter() - started)
+        assert response.status_code in (200, 304), response.status_code
+    return min(timings), response.num_bytes_downloaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--database', default='superjoin_bench')
+    args = parser.parse_args()
+
+    ensure_database(args.database)
+    from loguru import logger
+    from fastapi.testclient import TestClient
+    from src.utils.postgres_curd import init_postgres_schema
+    from src.utils.records_cache import bump_table_version
+
+    logger.remove()
+    init_postgres_schema()
+    client = TestClient(make_app())
+    identity = {'Accept-Encoding': 'identity'}
+
+    print(f"{'rows':>9} {'path':>10} {'seconds':>9} {'req/s':>9} {'MB':>8} {'vs legacy':>10}")
+    for size in args.sizes:
+        seed(size)
+        bump_table_version()
+        etag = client.get('/records', headers=identity).headers['ETag']
+        paths = [
+            ('legacy', lambda: client.get('/legacy/records', headers=identity), None),
+            ('fast miss', lambda: client.get('/records', headers=identity), bump_table_version),
+            ('fast gzip', lambda: client.get('/records', headers={'Accept-Encoding': 'gzip'}), bump_table_version),
+            ('fast hit', lambda: client.get('/records', headers=identity), None),
+            ('fast 304', lambda: client.get('/records', headers={**identity, 'If-None-Match': etag}), None),
+        ]
+        legacy_seconds = None
+        for name, request, before in paths:
+            seconds, size_bytes = best_time(request, args.repeat, before)
+            legacy_seconds = legacy_seconds or seconds
+            print(f"{size:>9} {name:>10} {seconds:>9.3f} {1 / seconds:>9.2f} {size_bytes / 1e6:>8.1f} "
+                  f"{legacy_seconds / seconds:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,19 +2,47 @@
 Author: Ayush Bhandari
 Email: ayushbhandariofficial@gmail.com
 """
+import time
+
+IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from starlette.staticfiles import StaticFiles
 from starlette.middleware.cors import CORSMiddleware
 # from src.all_routes import router
-from src.syncfunctions.sync import start_background_sync
+from src.syncfunctions.sync import start_background_sync, stop_background_sync
+from src.utils.change_listener import start_change_listener
+from src.utils.postgres_curd import get_engine
+from src.utils.warmup import warm_up, record_import_time
 from src.routes.all_routes import router
 import os
 
 from uvicorn import run
 
+record_import_time(time.perf_counter() - IMPORT_STARTED)
+
+
+async def warm_up_and_start(app):
+    # Cache invalidation only needs Postgres; the sync loop needs both sides
+    await warm_up(on_postgres_ready=lambda: start_change_listener(get_engine()))
+    start_background_sync(app)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Importing the app does no I/O; connections, DDL and credentials are set up here, in the
+    # background, so the server accepts requests right away and /ready reports progress
+    warm_up_task = asyncio.create_task(warm_up_and_start(app))
+    yield
+    warm_up_task.cancel()
+    await stop_background_sync(app)
+
 
 app = FastAPI(
-    title="Google Sheets to PostgreSQL Two-way Sync API"
+    title="Google Sheets to PostgreSQL Two-way Sync API",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -27,10 +55,5 @@ app.add_middleware(
 )
 app.include_router(router)
 
-
-@app.on_event("startup")
-async def startup_event():
-    start_background_sync(app)
-
 if __name__ == "__main__":
-    run("main:app", host="0.0.0.0", port=7878, reload=True)
\ No newline at end of file
+    run("main:app", host="0.0.0.0", port=7878, reload=True)
@@ -5,23 +5,33 @@ Email: ayushbhandariofficial@gmail.com
 from datetime import datetime
 import pickle
 import os
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from google.auth.transport.requests import Request
+import threading
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build, build_from_document
 from loguru import logger
 
 
 SPREADSHEET_ID = os.getenv("SPREADSHEET_ID")
 RANGE_NAME = 'Sheet1!A1:J26'
 
+SHEETS_CLIENT_SECRET_FILE = os.path.join(r'', 'client_secrets.json')
+SHEETS_API_NAME = 'sheets'
+SHEETS_API_VERSION = 'v4'
+SHEETS_SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
 
-def Create_Service(client_secret_file, api_name, api_version, *scopes):
-    logger.info(client_secret_file, api_name, api_version, scopes, sep='-')
+# Credentials and the discovery document are loaded once and shared. Each thread gets its own
+# service on top of them, since the httplib2 client underneath a service is not thread-safe.
+_credentials = None
+_discovery_document = None
+_load_lock = threading.Lock()
+_local = threading.local()
+
+
+def load_credentials(client_secret_file, api_name, api_version, scopes, interactive=True):
     CLIENT_SECRET_FILE = client_secret_file
     API_SERVICE_NAME = api_name
     API_VERSION = api_version
-    SCOPES = [scope for scope in scopes[0]]
-
+    SCOPES = scopes
 
     cred = None
 
@@ -33,14 +43,29 @@ def Create_Service(client_secret_file, api_name, api_version, *scopes):
             cred = pickle.load(token)
 
     if not cred or not cred.valid:
+        # Imported here, not at module level: together they add ~0.3s to every server start
         if cred and cred.expired and cred.refresh_token:
+            from google.auth.transport.requests import Request
             cred.refresh(Request())
+        elif not interactive:
+            # Never block a server worker on a browser consent screen
+            raise RuntimeError("No valid Google credentials; run `python -m src.gsheetsconnection.oauth` to authorize.")
         else:
+            from google_auth_oauthlib.flow import InstalledAppFlow
             flow = InstalledAppFlow.from_client_secrets_file(CLIENT_SECRET_FILE, SCOPES)
             cred = flow.run_local_server()
 
         with open(pickle_file, 'wb') as token:
             pickle.dump(cred, token)
+    return cred
+
+
+def Create_Service(client_secret_file, api_name, api_version, *scopes, interactive=True):
+    logger.info(client_secret_file, api_name, api_version, scopes, sep='-')
+    API_SERVICE_NAME = api_name
+    API_VERSION = api_version
+    cred = load_credentials(client_secret_file, api_name, api_version, [scope for scope in scopes[0]],
+                            interactive=interactive)
 
     try:
         service = build(API_SERVICE_NAME, API_VERSION, credentials=cred)
@@ -52,12 +77,35 @@ def Create_Service(client_secret_file, api_name, api_version, *scopes):
         return None
 
 
-def authenticate_sheets():
-    FOLDER_PATH = r''
-    CLIENT_SECRET_FILE = os.path.join(FOLDER_PATH, 'client_secrets.json')
-    API_SERVICE_NAME = 'sheets'
-    API_VERSION = 'v4'
-    SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+def load_sheets_client(interactive=False):
+    """
+    Load the shared credentials and the Sheets discovery document, once per process.
+
+    Credentials come from the token pickle; the browser OAuth flow only runs when interactive
+    is True.
+    """
+    global _credentials, _discovery_document
+    with _load_lock:
+        if _credentials is None:
+            document = discovery_cache.get_static_doc(SHEETS_API_NAME, SHEETS_API_VERSION)
+            if document is None:
+                raise RuntimeError(f"No bundled discovery document for {SHEETS_API_NAME} {SHEETS_API_VERSION}.")
+            _credentials = load_credentials(SHEETS_CLIENT_SECRET_FILE, SHEETS_API_NAME, SHEETS_API_VERSION,
+                                            SHEETS_SCOPES, interactive=interactive)
+            _discovery_document = document
+    return _credentials, _discovery_document
+
+
+def authenticate_sheets(interactive=False):
+    """Return this thread's spreadsheets() resource, built on the shared credentials on first use."""
+    sheets = getattr(_local, 'sheets', None)
+    if sheets is None:
+        credentials, document = load_sheets_client(interactive)
+        # Only the thin per-thread client is built here: no file or network I/O
+        sheets = _local.sheets = build_from_document(document, credentials=credentials).spreadsheets()
+    return sheets
+
 
-    service = Create_Service(CLIENT_SECRET_FILE, API_SERVICE_NAME, API_VERSION, SCOPES)
-    return service.spreadsheets()
+if __name__ == '__main__':
+    # One-off interactive authorization; stores the token pickle the server then reuses
+    authenticate_sheets(interactive=True)
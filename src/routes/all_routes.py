@@ -5,8 +5,14 @@ Email: ayushbhandariofficial@gmail.com
 from fastapi import APIRouter
 
 from src.routes.postgres_curd_endpoints import router as postgres_curd
+from src.routes.sync_endpoints import router as sync_endpoints
+from src.routes.change_feed_endpoints import router as change_feed_endpoints
+from src.routes.readiness_endpoints import router as readiness_endpoints
 
 
 router = APIRouter()
 
-router.include_router(postgres_curd)
\ No newline at end of file
+router.include_router(postgres_curd)
+router.include_router(sync_endpoints)
+router.include_router(change_feed_endpoints)
+router.include_router(readiness_endpoints)
\ No newline at end of file
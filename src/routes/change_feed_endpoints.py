@@ -0,0 +1,62 @@
+"""
+Author: Ayush Bhandari
+Email: ayushbhandariofficial@gmail.com
+"""
+import asyncio
+from fastapi import APIRouter, Header, Request
+from fastapi.responses import StreamingResponse
+from src.utils.change_feed import change_hub, dump_change
+from typing import Optional
+
+router = APIRouter()
+
+KEEPALIVE_INTERVAL = 15
+
+
+def format_sse(event_type, data, event_id=None):
+    message = f"event: {event_type}\ndata: {data}\n"
+    if event_id is not None:
+        message = f"id: {event_id}\n" + message
+    return message + "\n"
+
+
+async def change_events(request: Request, subscriber):
+    try:
+        if subscriber.reset:
+            # The resume point is gone; the client has to re-read /records
+            yield format_sse('reset', '{}')
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), timeout=KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": keepalive\n\n"
+                continue
+            if event is None:
+                # The change listener reconnected and may have missed events
+                yield format_sse('reset', '{}')
+                continue
+            yield format_sse(event['op'], dump_change(event), event['seq'])
+            if subscriber.overflowed and subscriber.queue.empty():
+                # Fell too far behind; reconnecting with Last-Event-ID resumes from the history
+                yield format_sse('overflow', '{}')
+                break
+    finally:
+        change_hub.unsubscribe(subscriber)
+
+
+# Stream record inserts, updates and deletes as Server-Sent Events
+@router.get("/records/changes")
+async def get_record_changes(request: Request,
+                             status: Optional[str] = None,
+                             region: Optional[str] = None,
+                             sales_rep: Optional[str] = None,
+                             since: Optional[int] = None,
+                             last_event_id: Optional[int] = Header(None)):
+    filters = {column: value for column, value in
+               [('status', status), ('region', region), ('sales_rep', sales_rep)] if value is not None}
+    last_seq = last_event_id if last_event_id is not None else since
+    subscriber = change_hub.subscribe(filters, last_seq)
+    return StreamingResponse(change_events(request, subscriber), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
@@ -2,25 +2,104 @@
 Author: Ayush Bhandari
 Email: ayushbhandariofficial@gmail.com
 """
-from fastapi import APIRouter, HTTPException
+import base64
+import binascii
+import json
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Header, Response, Query
 from src.datamodels.postgres_curd_model import ItemCreate, ItemUpdate, Item
-from src.utils.postgres_curd import fetch_postgres_data, insert_postgres_record, update_postgres_record, \
-    delete_postgres_record, upsert_postgres_record
+from src.utils.postgres_curd import fetch_postgres_rows, insert_postgres_record, update_postgres_record, \
+    delete_postgres_record, upsert_postgres_record, query_postgres_records, postgres_record_exists, RECORD_COLUMNS
+from src.utils.records_cache import get_table_version, get_cached_response, store_cached_response, etag_matches, \
+    encoded_body, encoded_etag
+from src.utils.records_serializer import serialize_records, choose_encoding, COMPRESSION_MIN_SIZE
 from src.datamodels.model import DataRecord
 from loguru import logger
-from typing import List
+from typing import List, Optional
 
 router = APIRouter()
 
+RECORDS_CACHE_KEY = 'records'
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 10000
+ID_INDEX = RECORD_COLUMNS.index('id')
+LAST_UPDATED_INDEX = RECORD_COLUMNS.index('last_updated')
 
-# Fetch all records
+
+def encode_cursor(row):
+    last_updated, record_id = row[LAST_UPDATED_INDEX], row[ID_INDEX]
+    last_updated = last_updated.isoformat() if last_updated is not None else None
+    token = json.dumps([last_updated, record_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(token).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        token = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        last_updated, record_id = json.loads(token)
+        last_updated = datetime.fromisoformat(last_updated) if last_updated is not None else None
+        return last_updated, int(record_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def records_response(cached, if_none_match, accept_encoding):
+    encoding = choose_encoding(accept_encoding) if len(cached.body) >= COMPRESSION_MIN_SIZE else None
+    etag = encoded_etag(cached.etag, encoding)
+    # no-cache lets pollers keep the body but forces a revalidation on every request
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding', **cached.headers}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    if encoding is None:
+        return Response(content=cached.body, media_type='application/json', headers=headers)
+    headers['Content-Encoding'] = encoding
+    return Response(content=encoded_body(cached, encoding), media_type='application/json', headers=headers)
+
+
+# Fetch records, either all at once or one filtered page at a time
 @router.get("/records", response_model=List[Item])
-def get_records():
+def get_records(if_none_match: Optional[str] = Header(None),
+                accept_encoding: Optional[str] = Header(None),
+                status: Optional[str] = None,
+                region: Optional[str] = None,
+                sales_rep: Optional[str] = None,
+                updated_since: Optional[datetime] = None,
+                updated_until: Optional[datetime] = None,
+                cursor: Optional[str] = None,
+                limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE)):
     try:
-        records = fetch_postgres_data()
-        if records.empty:
-            return []
-        return records.to_dict(orient="records")
+        filters = {'status': status, 'region': region, 'sales_rep': sales_rep,
+                   'updated_since': updated_since, 'updated_until': updated_until}
+        paginated = cursor is not None or limit is not None or any(v is not None for v in filters.values())
+        cache_key = RECORDS_CACHE_KEY
+        if paginated:
+            cache_key = json.dumps([filters, cursor, limit], default=str, sort_keys=True)
+
+        cached = get_cached_response(cache_key)
+        if cached is not None:
+            return records_response(cached, if_none_match, accept_encoding)
+
+        version = get_table_version()
+        headers = {}
+        if paginated:
+            page_size = limit or DEFAULT_PAGE_SIZE
+            after = decode_cursor(cursor) if cursor is not None else None
+            rows = query_postgres_records(after=after, limit=page_size, **filters)
+            if len(rows) == page_size:
+                # Clients follow X-Next-Cursor until it is absent
+                headers['X-Next-Cursor'] = encode_cursor(rows[-1])
+        else:
+            rows = fetch_postgres_rows()
+            if rows is None:
+                # fetch_postgres_rows() failed; don't pin the error result in the cache
+                return []
+
+        # Rows come straight from google_sheet_data, so they skip response_model validation
+        body = serialize_records(RECORD_COLUMNS, rows)
+        cached = store_cached_response(cache_key, version, body, headers)
+        return records_response(cached, if_none_match, accept_encoding)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching records: {e}")
         raise HTTPException(status_code=500, detail="Error fetching records")
@@ -44,8 +123,7 @@ def create_record(record: ItemCreate):
 @router.put("/records/{record_id}", response_model=Item)
 def update_record(record_id: int, record: ItemUpdate):
     try:
-        existing_record_df = fetch_postgres_data()
-        if existing_record_df.empty or record_id not in existing_record_df['id'].values:
+        if not postgres_record_exists(record_id):
             raise HTTPException(status_code=404, detail="Record not found")
 
         # Ensure last_updated is part of the update
@@ -0,0 +1,15 @@
+"""
+Author: Ayush Bhandari
+Email: ayushbhandariofficial@gmail.com
+"""
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from src.utils.warmup import readiness, is_ready
+
+router = APIRouter()
+
+
+# Readiness probe: 503 until Postgres is warmed up; the sheets field is informational
+@router.get("/ready", response_model=dict)
+def get_readiness():
+    return JSONResponse(status_code=200 if is_ready() else 503, content=readiness)
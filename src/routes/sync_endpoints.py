@@ -0,0 +1,19 @@
+"""
+Author: Ayush Bhandari
+Email: ayushbhandariofficial@gmail.com
+"""
+from fastapi import APIRouter, HTTPException
+from src.syncfunctions.leader import get_leader_info
+from loguru import logger
+
+router = APIRouter()
+
+
+# Report which worker currently holds the sync leader lock
+@router.get("/sync/leader", response_model=dict)
+def get_sync_leader():
+    try:
+        return get_leader_info()
+    except Exception as e:
+        logger.error(f"Error fetching sync leader: {e}")
+        raise HTTPException(status_code=500, detail="Error fetching sync leader")
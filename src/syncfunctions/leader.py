@@ -0,0 +1,114 @@
+"""
+Author: Ayush Bhandari
+Email: ayushbhandariofficial@gmail.com
+"""
+import os
+import socket
+from sqlalchemy import text
+from loguru import logger
+from src.utils.postgres_curd import get_engine
+
+# Only the worker holding this session-level advisory lock runs the sync loop. Postgres drops
+# the lock as soon as the holder's connection goes away, so a follower takes over on its next
+# retry. Session locks need a real session: point this at Postgres directly, not at a
+# transaction-pooling PgBouncer.
+SYNC_LEADER_LOCK_ID = int(os.getenv('SYNC_LEADER_LOCK_ID', '72043501'))
+LEADER_RETRY_INTERVAL = 5
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# Server-side keepalives so a leader whose host vanished (no FIN) is detected in ~25s
+# instead of the kernel default of two hours.
+LEADER_KEEPALIVE_SETTINGS = {
+    'tcp_keepalives_idle': '10',
+    'tcp_keepalives_interval': '5',
+    'tcp_keepalives_count': '3',
+}
+
+_leader_connection = None
+
+
+def is_leader():
+    return _leader_connection is not None
+
+
+def _drop_leader_connection():
+    global _leader_connection
+    connection, _leader_connection = _leader_connection, None
+    if connection is None:
+        return
+    try:
+        # Never hand a connection that may still hold the lock back to the pool
+        connection.invalidate()
+        connection.close()
+    except Exception as e:
+        logger.error(f"Error closing sync leader connection: {e}")
+
+
+def try_acquire_leadership():
+    """Return True if this worker holds the sync leader lock, acquiring it if it is free."""
+    global _leader_connection
+    if _leader_connection is not None:
+        try:
+            _leader_connection.execute(text("SELECT 1"))
+            return True
+        except Exception as e:
+            logger.error(f"Lost sync leadership: {e}")
+            _drop_leader_connection()
+            return False
+
+    try:
+        connection = get_engine().connect().execution_options(isolation_level="AUTOCOMMIT")
+    except Exception as e:
+        logger.error(f"Error connecting for sync leadership: {e}")
+        return False
+    try:
+        acquired = connection.execute(text("SELECT pg_try_advisory_lock(:key)"),
+                                      {'key': SYNC_LEADER_LOCK_ID}).scalar()
+        if not acquired:
+            connection.close()
+            return False
+        for setting, value in LEADER_KEEPALIVE_SETTINGS.items():
+            connection.execute(text("SELECT set_config(:setting, :value, false)"),
+                               {'setting': setting, 'value': value})
+        connection.execute(text("SELECT set_config('application_name', :name, false)"),
+                           {'name': f"sync-leader {WORKER_ID}"})
+    except Exception as e:
+        logger.error(f"Error acquiring sync leadership: {e}")
+        connection.invalidate()
+        connection.close()
+        return False
+
+    _leader_connection = connection
+    logger.info(f"Worker {WORKER_ID} acquired sync leadership.")
+    return True
+
+
+def release_leadership():
+    if _leader_connection is None:
+        return
+    try:
+        _leader_connection.execute(text("SELECT pg_advisory_unlock(:key)"), {'key': SYNC_LEADER_LOCK_ID})
+        logger.info(f"Worker {WORKER_ID} released sync leadership.")
+    except Exception as e:
+        logger.error(f"Error releasing sync leadership: {e}")
+    finally:
+        _drop_leader_connection()
+
+
+def get_leader_info():
+    # A bigint advisory key is reported in pg_locks split across classid (high) and objid (low)
+    query = text("""
+        SELECT a.pid, a.application_name, a.client_addr::text AS client_addr, a.backend_start
+        FROM pg_locks l
+        JOIN pg_stat_activity a ON a.pid = l.pid
+        WHERE l.locktype = 'advisory' AND l.granted AND l.objsubid = 1
+          AND l.classid::bigint = :classid AND l.objid::bigint = :objid
+    """)
+    with get_engine().connect() as connection:
+        holder = connection.execute(query, {'classid': SYNC_LEADER_LOCK_ID >> 32,
+                                            'objid': SYNC_LEADER_LOCK_ID & 0xFFFFFFFF}).mappings().first()
+    return {
+        'worker_id': WORKER_ID,
+        'is_leader': is_leader(),
+        'leader': dict(holder) if holder else None,
+    }
@@ -0,0 +1,91 @@
+"""
+Author: Ayush Bhandari
+Email: ayushbhandariofficial@gmail.com
+"""
+import hashlib
+from bisect import bisect_right
+from collections import defaultdict
+from loguru import logger
+from src.utils.gsheets_curd import fetch_sheets_keys, fetch_sheets_rows, convert_to_datetime
+from src.utils.postgres_curd import fetch_postgres_block_checksums, fetch_postgres_data_in_ranges
+from src.syncfunctions.reconcile import apply_changes
+
+# Blocks start at MERKLE_ROOT_BLOCK_SIZE ids and are split MERKLE_FANOUT ways while their
+# checksums differ, down to MERKLE_LEAF_BLOCK_SIZE ids, which are fetched in full and diffed.
+MERKLE_ROOT_BLOCK_SIZE = 4096
+MERKLE_FANOUT = 16
+MERKLE_LEAF_BLOCK_SIZE = 64
+
+
+def sheets_row_key(record_id, last_updated):
+    # Must match the 'id|YYYY-MM-DD HH24:MI:SS' string built in fetch_postgres_block_checksums
+    parsed = convert_to_datetime(last_updated) if last_updated else None
+    return f"{record_id}|{parsed.strftime('%Y-%m-%d %H:%M:%S') if parsed else ''}"
+
+
+def in_id_ranges(record_id, ranges):
+    # ranges are sorted, disjoint and half-open
+    position = bisect_right(ranges, (record_id, float('inf'))) - 1
+    return position >= 0 and record_id < ranges[position][1]
+
+
+def sheets_block_checksums(keys, block_size, ranges=None):
+    blocks = defaultdict(list)
+    for record_id, row_key in keys:
+        if ranges is not None and not in_id_ranges(record_id, ranges):
+            continue
+        blocks[record_id // block_size].append(row_key)
+    return {block: hashlib.md5(','.join(row_keys).encode('utf-8')).hexdigest()
+            for block, row_keys in blocks.items()}
+
+
+def find_mismatched_ranges(keys):
+    """Return the half-open id ranges whose Sheets and PostgreSQL checksums differ, or None on failure."""
+    block_size, ranges = MERKLE_ROOT_BLOCK_SIZE, None
+    while True:
+        postgres_checksums = fetch_postgres_block_checksums(block_size, ranges)
+        if postgres_checksums is None:
+            return None
+        sheets_checksums = sheets_block_checksums(keys, block_size, ranges)
+        mismatched = sorted(block for block in postgres_checksums.keys() | sheets_checksums.keys()
+                            if postgres_checksums.get(block) != sheets_checksums.get(block))
+        logger.info(f"{len(mismatched)} mismatched blocks of {block_size} ids.")
+
+        ranges = []
+        for block in mismatched:
+            start, end = block * block_size, (block + 1) * block_size
+            if ranges and ranges[-1][1] == start:
+                ranges[-1] = (ranges[-1][0], end)
+            else:
+                ranges.append((start, end))
+        if not ranges or block_size <= MERKLE_LEAF_BLOCK_SIZE:
+            return ranges
+        block_size = max(block_size // MERKLE_FANOUT, MERKLE_LEAF_BLOCK_SIZE)
+
+
+def merkle_sync():
+    keys_df = fetch_sheets_keys()
+    if keys_df is None:
+        return "Synchronization failed: could not fetch Google Sheets keys."
+
+    # (id, row key) pairs sorted by id so each block's keys are joined in id order
+    keys = sorted((int(record_id), sheets_row_key(record_id, last_updated))
+                  for record_id, last_updated in zip(keys_df['id'], keys_df['last_updated']))
+
+    ranges = find_mismatched_ranges(keys)
+    if ranges is None:
+        return "Synchronization failed: could not fetch PostgreSQL checksums."
+    if not ranges:
+        logger.info("Sheets and PostgreSQL checksums match.")
+        return "No changes to sync."
+
+    in_ranges = keys_df['id'].apply(in_id_ranges, args=(ranges,))
+    sheets_df = fetch_sheets_rows(keys_df.loc[in_ranges, 'row_number'].tolist())
+    postgres_df = fetch_postgres_data_in_ranges(ranges)
+    if sheets_df is None or postgres_df is None:
+        return "Synchronization failed: could not fetch mismatched blocks."
+
+    logger.info(f"Reconciling {len(sheets_df)} Sheets rows and {len(postgres_df)} PostgreSQL rows "
+                f"in {len(ranges)} id ranges.")
+    apply_changes(sheets_df, postgres_df)
+    return "Synchronization complete."
@@ -0,0 +1,148 @@
+"""
+Author: Ayush Bhandari
+Email: ayushbhandariofficial@gmail.com
+"""
+from loguru import logger
+from src.utils.gsheets_curd import add_rows_to_sheets, update_rows_in_sheets, delete_rows_from_sheets, \
+    convert_to_datetime
+from src.utils.postgres_curd import delete_postgres_records, upsert_postgres_record, upsert_postgres_records
+from src.datamodels.model import DataRecord
+
+
+def find_changed_ids(sheets_keys, postgres_keys):
+    """
+    Return the ids whose last_updated differs between the sides or that exist on one side only.
+
+    sheets_keys is the frame from fetch_sheets_keys(), postgres_keys the dict from
+    fetch_postgres_keys().
+    """
+    missing = object()
+    sheets_versions = {
+        record_id: convert_to_datetime(last_updated) if last_updated else None
+        for record_id, last_updated in zip(sheets_keys['id'].tolist(), sheets_keys['last_updated'].tolist())
+    }
+    return {record_id for record_id in sheets_versions.keys() | postgres_keys.keys()
+            if sheets_versions.get(record_id, missing) != postgres_keys.get(record_id, missing)}
+
+
+def apply_changes(sheets_df, postgres_df):
+    """
+    Reconcile the given Sheets and PostgreSQL rows and write the winners to the other side.
+
+    Both frames must cover the same id range: an id found on only one side is handled as
+    missing from the other. The sync engines pass either the full tables or matching slices.
+    sheets_df must keep fetch_sheets_rows()'s index, the sheet row number minus 2, so rows can
+    be overwritten in place without looking them up again.
+    """
+    sheets_row_numbers = dict(zip(sheets_df['id'].tolist(), (sheets_df.index + 2).tolist())) \
+        if not sheets_df.empty else {}
+
+    # Ensure that 'id' is the key
+    if not sheets_df.empty:
+        sheets_df.set_index('id', inplace=True)
+    if not postgres_df.empty:
+        postgres_df.set_index('id', inplace=True)
+
+    # Get sets of IDs in both Google Sheets and PostgreSQL
+    sheets_ids = set(sheets_df.index.tolist()) if not sheets_df.empty else set()
+    postgres_ids = set(postgres_df.index.tolist()) if not postgres_df.empty else set()
+
+    # Step 1: Handle Insertions and Updates from Google Sheets to PostgreSQL
+    common_ids = sheets_ids & postgres_ids
+    sheets_only_ids = sheets_ids - postgres_ids
+    postgres_only_ids = postgres_ids - sheets_ids
+
+    sheets_updates = []
+    for idx in common_ids:
+        sheets_row = sheets_df.loc[idx]
+        postgres_row = postgres_df.loc[idx]
+
+        # print(sheets_row['last_updated'])
+        # print(postgres_row['last_updated'])
+        if sheets_row['last_updated'] > postgres_row['last_updated']:
+            # Sheets has newer data; update PostgreSQL
+            record = DataRecord(
+                id=idx,
+                first_name=sheets_row['first_name'],
+                last_name=sheets_row['last_name'],
+                status=sheets_row['status'],
+                region=sheets_row['region'],
+                sales_rep=sheets_row['sales_rep'],
+                follow_up=sheets_row['follow_up'],
+                notes=sheets_row['notes'],
+                last_updated=sheets_row['last_updated']
+            )
+            upsert_postgres_record(record)
+            logger.info(f"Upserted record ID {record.id} in PostgreSQL from Sheets.")
+
+        elif postgres_row['last_updated'] > sheets_row['last_updated']:
+            # PostgreSQL has newer data; update Google Sheets
+            record = DataRecord(
+                id=idx,
+                first_name=postgres_row['first_name'],
+                last_name=postgres_row['last_name'],
+                status=postgres_row['status'],
+                region=postgres_row['region'],
+                sales_rep=postgres_row['sales_rep'],
+                follow_up=postgres_row['follow_up'],
+                notes=postgres_row['notes'],
+                last_updated=postgres_row['last_updated']
+            )
+            sheets_updates.append((sheets_row_numbers[idx], record))
+
+    # PostgreSQL has newer data for these; overwrite them in Google Sheets with one call
+    if sheets_updates and update_rows_in_sheets(sheets_updates):
+        logger.info(f"Updated {len(sheets_updates)} records in Google Sheets from PostgreSQL.")
+
+    # Handle new records from Google Sheets
+    new_in_sheets = []
+    for idx in sheets_only_ids:
+        sheets_row = sheets_df.loc[idx]
+        record = DataRecord(
+            id=idx,
+            first_name=sheets_row['first_name'],
+            last_name=sheets_row['last_name'],
+            status=sheets_row['status'],
+            region=sheets_row['region'],
+            sales_rep=sheets_row['sales_rep'],
+            follow_up=sheets_row['follow_up'],
+            notes=sheets_row['notes'],
+            last_updated=sheets_row['last_updated']
+        )
+        new_in_sheets.append(record)
+    upserted = upsert_postgres_records(new_in_sheets)
+    if upserted and new_in_sheets:
+        logger.info(f"Inserted {len(new_in_sheets)} new records into PostgreSQL from Sheets.")
+
+    # Handle new records from PostgreSQL
+    new_in_postgres = []
+    for idx in postgres_only_ids:
+        postgres_row = postgres_df.loc[idx]
+        record = DataRecord(
+            id=idx,
+            first_name=postgres_row['first_name'],
+            last_name=postgres_row['last_name'],
+            status=postgres_row['status'],
+            region=postgres_row['region'],
+            sales_rep=postgres_row['sales_rep'],
+            follow_up=postgres_row['follow_up'],
+            notes=postgres_row['notes'],
+            last_updated=postgres_row['last_updated']
+        )
+        new_in_postgres.append(record)
+    appended_ids = add_rows_to_sheets(new_in_postgres)
+    if appended_ids:
+        logger.info(f"Added {len(appended_ids)} new records to Google Sheets from PostgreSQL.")
+
+    # Step 2: Deletions
+    # A record copied to the other side is removed from this one, but only once the other side
+    # confirmed the write: a failed append or upsert leaves both copies for the next pass.
+    # Records present in PostgreSQL but not in Google Sheets -> delete from PostgreSQL
+    if appended_ids and delete_postgres_records(appended_ids):
+        logger.info(f"Deleted {len(appended_ids)} records from PostgreSQL.")
+
+    # Records present in Google Sheets but not in PostgreSQL -> delete from Google Sheets
+    moved_rows = [sheets_row_numbers[idx] for idx in sheets_only_ids] if upserted else []
+    if moved_rows and delete_rows_from_sheets(moved_rows):
+        logger.info(f"Deleted {len(moved_rows)} records from Google Sheets.")
+
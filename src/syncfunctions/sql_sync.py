@@ -0,0 +1,57 @@
+"""
+Author: Ayush Bhandari
+Email: ayushbhandariofficial@gmail.com
+"""
+import pandas as pd
+from collections import Counter
+from loguru import logger
+from pydantic import ValidationError
+from src.utils.gsheets_curd import fetch_sheets_data, add_rows_to_sheets, update_rows_in_sheets, \
+    delete_rows_from_sheets
+from src.utils.postgres_curd import reconcile_sheet_snapshot, delete_postgres_records, RECORD_COLUMNS
+from src.datamodels.model import DataRecord
+
+
+def sheet_snapshot_rows(sheets_df):
+    """Yield (row_number, *RECORD_COLUMNS) tuples; the sheet row number is index + 2."""
+    for index, row in zip(sheets_df.index, sheets_df[RECORD_COLUMNS].itertuples(index=False)):
+        yield (index + 2,) + tuple(None if pd.isna(value) else value for value in row)
+
+
+def sql_sync():
+    sheets_df = fetch_sheets_data()
+    if sheets_df.columns.empty:
+        # fetch_sheets_data() failed; an empty snapshot would look like every row was deleted
+        return "Synchronization failed: could not fetch Google Sheets data."
+
+    sheets_changes = reconcile_sheet_snapshot(sheet_snapshot_rows(sheets_df))
+    if sheets_changes is None:
+        return "Synchronization failed: could not reconcile in PostgreSQL."
+
+    updates, appends, deleted_rows = [], [], []
+    for action, row_number, record in sheets_changes:
+        if action == 'delete_sheets':
+            deleted_rows.append(row_number)
+            continue
+        try:
+            data_record = DataRecord(**record)
+        except ValidationError as e:
+            # Left as is on both sides; a PostgreSQL-only record stays in PostgreSQL
+            logger.error(f"Skipping record {record['id']} for Sheets: {e}")
+            continue
+        if action == 'update_sheets':
+            updates.append((row_number, data_record))
+        else:
+            appends.append(data_record)
+
+    update_rows_in_sheets(updates)
+    if appends:
+        # The PostgreSQL copy is only removed once the record is in Sheets
+        appended_ids = add_rows_to_sheets(appends)
+        if appended_ids:
+            delete_postgres_records(appended_ids)
+    # Last, since deleting rows shifts the row numbers the updates refer to
+    delete_rows_from_sheets(deleted_rows)
+
+    logger.info(f"Applied Sheets changes: {dict(Counter(action for action, _, _ in sheets_changes))}")
+    return "Synchronization complete."
@@ -0,0 +1,145 @@
+"""
+Author: Ayush Bhandari
+Email: ayushbhandariofficial@gmail.com
+"""
+from collections import Counter
+from loguru import logger
+from src.utils.gsheets_curd import fetch_sheets_keys, fetch_sheets_rows, convert_to_datetime, add_rows_to_sheets, \
+    update_rows_in_sheets, delete_rows_from_sheets
+from src.utils.postgres_curd import stream_postgres_records, upsert_postgres_records, delete_postgres_records
+from src.datamodels.model import DataRecord
+
+# Upper bound on the full rows held in memory on either side, and on the size of each write batch
+STREAM_CHUNK_SIZE = 500
+
+RECORD_FIELDS = ['first_name', 'last_name', 'status', 'region', 'sales_rep', 'follow_up', 'notes', 'last_updated']
+
+
+def record_from_row(record_id, row):
+    return DataRecord(id=record_id, **{field: row[field] for field in RECORD_FIELDS})
+
+
+def iter_sheets_keys(keys_df):
+    """Yield (id, row_number, last_updated) in id order from the narrow Sheets key fetch."""
+    for key in keys_df.sort_values('id').itertuples(index=False):
+        last_updated = convert_to_datetime(key.last_updated) if key.last_updated else None
+        yield int(key.id), key.row_number, last_updated
+
+
+def fetch_pending_rows(pending):
+    """Fetch the full Sheets rows for pending {row_number: sheets_only} and turn them into events."""
+    sheets_df = fetch_sheets_rows(list(pending))
+    if sheets_df is None:
+        raise RuntimeError("could not fetch Google Sheets rows")
+    for index, row in sheets_df.iterrows():
+        row_number = index + 2
+        record = record_from_row(int(row['id']), row)
+        yield 'upsert_postgres', record
+        if pending[row_number]:
+            # Same as the full sync: a Sheets-only record is copied to PostgreSQL and then
+            # removed from Sheets
+            yield 'delete_sheets', (row_number, record.id)
+    pending.clear()
+
+
+def plan_changes(sheets_keys, postgres_rows, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Merge-join two id-ordered streams and yield (event, payload) change events.
+
+    sheets_keys yields (id, row_number, last_updated); postgres_rows yields full rows. Full
+    Sheets rows are only fetched for ids whose Sheets side wins, chunk_size rows at a time.
+    """
+    pending = {}
+    sheets_key = next(sheets_keys, None)
+    postgres_row = next(postgres_rows, None)
+
+    while sheets_key is not None or postgres_row is not None:
+        if postgres_row is None or (sheets_key is not None and sheets_key[0] < postgres_row.id):
+            pending[sheets_key[1]] = True
+            sheets_key = next(sheets_keys, None)
+        elif sheets_key is None or postgres_row.id < sheets_key[0]:
+            # Same as the full sync: a PostgreSQL-only record is copied to Sheets and then
+            # removed from PostgreSQL
+            yield 'append_sheets', record_from_row(postgres_row.id, postgres_row._mapping)
+            yield 'delete_postgres', postgres_row.id
+            postgres_row = next(postgres_rows, None)
+        else:
+            record_id, row_number, sheets_updated = sheets_key
+            postgres_updated = postgres_row.last_updated
+            if sheets_updated is not None and postgres_updated is not None:
+                if sheets_updated > postgres_updated:
+                    pending[row_number] = False
+                elif postgres_updated > sheets_updated:
+                    yield 'update_sheets', (row_number, record_from_row(record_id, postgres_row._mapping))
+            sheets_key = next(sheets_keys, None)
+            postgres_row = next(postgres_rows, None)
+
+        if len(pending) >= chunk_size:
+            yield from fetch_pending_rows(pending)
+
+    if pending:
+        yield from fetch_pending_rows(pending)
+
+
+def apply_events(events, batch_size=STREAM_CHUNK_SIZE):
+    """
+    Apply change events in batches.
+
+    A record's old copy is deleted only after the write to the other side succeeded.
+    delete_postgres ids wait for their append_sheets batch, and delete_sheets rows wait for their
+    upsert_postgres batch. Deletions run after the stream is drained. Sheets rows go last, since
+    deleting them shifts the row numbers that update events refer to.
+    """
+    batches = {'upsert_postgres': [], 'append_sheets': [], 'update_sheets': []}
+    written_ids = {'upsert_postgres': set(), 'append_sheets': set()}
+    postgres_deletes, sheets_deletes = [], []
+    counts = Counter()
+
+    def flush(event):
+        batch, batches[event] = batches[event], []
+        if not batch:
+            return
+        if event == 'upsert_postgres':
+            if upsert_postgres_records(batch):
+                written_ids[event].update(record.id for record in batch)
+        elif event == 'append_sheets':
+            written_ids[event].update(add_rows_to_sheets(batch))
+        else:
+            update_rows_in_sheets(batch)
+
+    for event, payload in events:
+        counts[event] += 1
+        if event == 'delete_postgres':
+            postgres_deletes.append(payload)
+        elif event == 'delete_sheets':
+            sheets_deletes.append(payload)
+        else:
+            batches[event].append(payload)
+            if len(batches[event]) >= batch_size:
+                flush(event)
+
+    for event in batches:
+        flush(event)
+
+    moved_ids = [record_id for record_id in postgres_deletes if record_id in written_ids['append_sheets']]
+    for start in range(0, len(moved_ids), batch_size):
+        delete_postgres_records(moved_ids[start:start + batch_size])
+    moved_rows = [row_number for row_number, record_id in sheets_deletes
+                  if record_id in written_ids['upsert_postgres']]
+    delete_rows_from_sheets(moved_rows)
+
+    kept = len(postgres_deletes) - len(moved_ids) + len(sheets_deletes) - len(moved_rows)
+    if kept:
+        logger.error(f"Kept {kept} records in place because copying them to the other side failed.")
+    return counts
+
+
+def stream_sync():
+    keys_df = fetch_sheets_keys()
+    if keys_df is None:
+        return "Synchronization failed: could not fetch Google Sheets keys."
+
+    events = plan_changes(iter_sheets_keys(keys_df), stream_postgres_records(STREAM_CHUNK_SIZE))
+    counts = apply_events(events)
+    logger.info(f"Applied change events: {dict(counts)}")
+    return "Synchronization complete."
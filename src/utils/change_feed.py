@@ -0,0 +1,134 @@
+"""
+Author: Ayush Bhandari
+Email: ayushbhandariofficial@gmail.com
+"""
+import asyncio
+import json
+import threading
+from collections import deque
+from datetime import datetime
+
+# Recent events kept for subscribers resuming from an event id
+CHANGE_HISTORY_SIZE = 1000
+# Events buffered per subscriber; a subscriber that falls further behind is cut off and resumes
+SUBSCRIBER_BUFFER_SIZE = 256
+# Columns subscribers can filter on; update events also carry their values from before the write
+FILTER_COLUMNS = ('status', 'region', 'sales_rep')
+
+
+def json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dump_change(change):
+    return json.dumps(change, default=json_default, separators=(',', ':'))
+
+
+class Subscriber:
+    def __init__(self, filters):
+        self.filters = filters
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_BUFFER_SIZE)
+        self.overflowed = False
+        # Set when the requested resume point is not in the history
+        self.reset = False
+
+    def matches(self, event):
+        record = event.get('record')
+        # Without the row values (oversized notifications) let the client decide
+        if record is None:
+            return True
+        # An update that moves a record out of the filter is still news to the subscriber
+        return any(values is not None and all(values.get(column) == value for column, value in self.filters.items())
+                   for values in (record, event.get('previous')))
+
+    def offer(self, event):
+        if self.overflowed or not self.matches(event):
+            return
+        self._put(event)
+
+    def interrupt(self):
+        """Tell the client that events may have been missed; None is read as a reset."""
+        self._put(None)
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class ChangeHub:
+    """
+    Fan out record change events to in-process subscribers.
+
+    publish() may be called from any thread. Events are added to the history and delivered in
+    one step on the event loop that serves the subscribers. Events come from the change listener, which gets them in commit order. seq is
+    taken from a PostgreSQL sequence in the writing transaction, so every worker holds the same
+    events under the same ids in the same order. Concurrent writers can commit out of seq order,
+    so a resume looks up the client's last id in the history instead of comparing numbers.
+    """
+
+    def __init__(self, history_size=CHANGE_HISTORY_SIZE):
+        self._lock = threading.Lock()
+        self._history = deque(maxlen=history_size)
+        self._subscribers = set()
+        self._loop = None
+
+    def publish(self, seq, op, record_id, record=None, previous=None):
+        event = {'seq': seq, 'op': op, 'id': record_id, 'record': record, 'previous': previous}
+        self._on_loop(self._deliver, event)
+        return event
+
+    def reset(self):
+        """Forget the history after events may have been missed, and tell current subscribers."""
+        self._on_loop(self._reset)
+
+    def _on_loop(self, callback, *args):
+        # History changes and delivery happen together on the loop thread, the same thread
+        # subscribe() replays history on, so a resuming subscriber can't see an event twice
+        with self._lock:
+            loop = self._loop
+            if loop is None or loop.is_closed():
+                # Nobody has subscribed yet; there is only history to keep
+                callback(*args)
+                return
+        loop.call_soon_threadsafe(callback, *args)
+
+    def _deliver(self, event):
+        self._history.append(event)
+        for subscriber in list(self._subscribers):
+            subscriber.offer(event)
+            if subscriber.overflowed:
+                self._subscribers.discard(subscriber)
+
+    def _reset(self):
+        self._history.clear()
+        for subscriber in list(self._subscribers):
+            subscriber.interrupt()
+            if subscriber.overflowed:
+                self._subscribers.discard(subscriber)
+
+    def subscribe(self, filters=None, last_seq=None):
+        """Register a subscriber, replaying history after last_seq. Must run on the event loop."""
+        subscriber = Subscriber(filters or {})
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            if last_seq is not None:
+                events = list(self._history)
+                position = next((index for index, event in enumerate(events) if event['seq'] == last_seq), None)
+                if position is None:
+                    subscriber.reset = True
+                else:
+                    for event in events[position + 1:]:
+                        subscriber.offer(event)
+            if not subscriber.overflowed:
+                self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self._subscribers.discard(subscriber)
+
+
+change_hub = ChangeHub()
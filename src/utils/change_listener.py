@@ -0,0 +1,118 @@
+"""
+Author: Ayush Bhandari
+Email: ayushbhandariofficial@gmail.com
+"""
+import json
+import select
+import threading
+import time
+import uuid
+from sqlalchemy import text
+from loguru import logger
+from src.utils.records_cache import bump_table_version
+from src.utils.change_feed import change_hub, dump_change
+
+# Every write to google_sheet_data NOTIFYs this channel in its transaction, so caches and change
+# feeds in other workers and replicas (and the non-leader workers while the leader syncs) see it too.
+CHANGE_CHANNEL = 'google_sheet_data_changed'
+# Numbers change events; nextval() runs in the writing transaction and the value rides in the payload
+CHANGE_SEQUENCE = 'google_sheet_data_change_seq'
+WORKER_ORIGIN = uuid.uuid4().hex
+# NOTIFY payloads must stay under 8000 bytes, seq included; larger changes are sent without the row values
+MAX_NOTIFY_PAYLOAD = 7900
+LISTEN_POLL_TIMEOUT = 30
+LISTEN_RECONNECT_DELAY = 5
+# Client-side libpq keepalives, so a LISTEN connection whose server or NAT mapping vanished
+# (no FIN) errors out in ~25s and goes through the reconnect path
+LISTEN_KEEPALIVE_ARGS = {
+    'keepalives': 1,
+    'keepalives_idle': 10,
+    'keepalives_interval': 5,
+    'keepalives_count': 3,
+}
+
+
+def notify_table_changed(session, changes):
+    """
+    Queue one numbered notification per (op, id, record, previous) change; Postgres delivers them on commit.
+
+    previous holds the FILTER_COLUMNS values from before an update, or None.
+    """
+    payloads = []
+    for op, record_id, record, previous in changes:
+        payload = dump_change({'origin': WORKER_ORIGIN, 'op': op, 'id': record_id, 'record': record,
+                               'previous': previous})
+        if len(payload.encode('utf-8')) > MAX_NOTIFY_PAYLOAD:
+            payload = dump_change({'origin': WORKER_ORIGIN, 'op': op, 'id': record_id, 'record': None,
+                                   'previous': None})
+        payloads.append(payload)
+    if not payloads:
+        return
+    # Payloads are JSON objects; splice the seq in as their first member
+    session.execute(text(f"""
+        SELECT pg_notify(:channel, '{{"seq":' || nextval('{CHANGE_SEQUENCE}') || ',' || substr(payload, 2))
+        FROM unnest(CAST(:payloads AS text[])) WITH ORDINALITY AS p(payload, position)
+        ORDER BY position
+    """), {'channel': CHANGE_CHANNEL, 'payloads': payloads})
+
+
+def handle_notification(payload):
+    """Apply a committed change to the local cache and change feed."""
+    try:
+        change = json.loads(payload)
+    except ValueError:
+        bump_table_version()
+        return
+    # The writing worker bumped its own cache on commit; its change feed is fed from here like
+    # everyone else's, so all workers see the same events in the same order
+    if change.get('origin') != WORKER_ORIGIN:
+        bump_table_version()
+    change_hub.publish(change.get('seq'), change.get('op'), change.get('id'), change.get('record'),
+                       change.get('previous'))
+
+
+def _connect(engine):
+    # A dedicated connection outside the pool, opened with the keepalive arguments
+    cargs, cparams = engine.dialect.create_connect_args(engine.url)
+    return engine.dialect.connect(*cargs, **{**cparams, **LISTEN_KEEPALIVE_ARGS})
+
+
+def _listen(engine):
+    while True:
+        dbapi_connection = None
+        try:
+            dbapi_connection = _connect(engine)
+            dbapi_connection.autocommit = True
+            with dbapi_connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANGE_CHANNEL}")
+            # Anything committed while we were not listening is unknown; start from a clean cache
+            # and make change feed clients resync
+            bump_table_version()
+            change_hub.reset()
+            logger.info(f"Listening for changes on channel {CHANGE_CHANNEL}.")
+
+            while True:
+                if select.select([dbapi_connection], [], [], LISTEN_POLL_TIMEOUT) == ([], [], []):
+                    # Quiet channel: check the connection is alive, so a dead one raises and reconnects
+                    # (this also collects any notification that arrives meanwhile)
+                    with dbapi_connection.cursor() as cursor:
+                        cursor.execute("SELECT 1")
+                else:
+                    dbapi_connection.poll()
+                while dbapi_connection.notifies:
+                    handle_notification(dbapi_connection.notifies.pop(0).payload)
+        except Exception as e:
+            logger.error(f"Change listener disconnected: {e}")
+        finally:
+            if dbapi_connection is not None:
+                try:
+                    dbapi_connection.close()
+                except Exception:
+                    pass
+        time.sleep(LISTEN_RECONNECT_DELAY)
+
+
+def start_change_listener(engine):
+    thread = threading.Thread(target=_listen, args=(engine,), name='change-listener', daemon=True)
+    thread.start()
+    return thread
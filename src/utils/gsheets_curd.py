@@ -35,6 +35,23 @@ def convert_to_datetime(datetime_str):
         return None
 
 
+def sheet_rows_to_dataframe(headers, data, index=None):
+    df = pd.DataFrame(data, columns=headers, index=index)
+
+    for column, dtype in [('id', int), ('first_name', str), ('last_name', str),
+                          ('status', str), ('region', str), ('sales_rep', str),
+                          ('follow_up', str), ('notes', str), ('last_updated', str)]:
+        if column in df.columns:
+            df[column] = df[column].astype(dtype, errors='ignore')
+        else:
+            df[column] = None
+
+    df['last_updated'] = df['last_updated'].apply(convert_to_datetime)
+
+    df.dropna(subset=['id'], inplace=True)
+    return df
+
+
 def fetch_sheets_data():
     if not SPREADSHEET_ID:
         logger.error("Error: SPREADSHEET_ID environment variable is not set.")
@@ -51,19 +68,7 @@ def fetch_sheets_data():
             ])
         headers = values[0]
         data = values[1:]
-        df = pd.DataFrame(data, columns=headers)
-
-        for column, dtype in [('id', int), ('first_name', str), ('last_name', str),
-                              ('status', str), ('region', str), ('sales_rep', str),
-                              ('follow_up', str), ('notes', str), ('last_updated', str)]:
-            if column in df.columns:
-                df[column] = df[column].astype(dtype, errors='ignore')
-            else:
-                df[column] = None
-
-        df['last_updated'] = df['last_updated'].apply(convert_to_datetime)
-
-        df.dropna(subset=['id'], inplace=True)
+        df = sheet_rows_to_dataframe(headers, data)
 
         logger.info(f"Fetched {len(df)} records from Google Sheets:")
         # print(df)
@@ -74,6 +79,108 @@ def fetch_sheets_data():
         return pd.DataFrame()
 
 
+def sheet_data_rows():
+    """Return (sheet name, first data row, last data row) of RANGE_NAME; row 1 holds the headers."""
+    sheet_name, cells = RANGE_NAME.split('!')
+    last_row = int(''.join(ch for ch in cells.split(':')[1] if ch.isdigit()))
+    return sheet_name, 2, last_row
+
+
+def parse_sheet_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def fetch_sheets_keys():
+    """
+    Fetch only the id (A) and last_updated (I) columns.
+
+    Returns a DataFrame with row_number, id and last_updated (as the raw sheet string), or
+    None if the Sheets API call failed. Rows without a numeric id are dropped, as in
+    fetch_sheets_data().
+    """
+    if not SPREADSHEET_ID:
+        logger.error("Error: SPREADSHEET_ID environment variable is not set.")
+        return None
+
+    sheet_name, first_row, last_row = sheet_data_rows()
+    try:
+        sheets = authenticate_sheets()
+        result = sheets.values().batchGet(
+            spreadsheetId=SPREADSHEET_ID,
+            ranges=[f'{sheet_name}!A{first_row}:A{last_row}', f'{sheet_name}!I{first_row}:I{last_row}'],
+            majorDimension='COLUMNS'
+        ).execute()
+    except HttpError as error:
+        logger.error(f"Error fetching Sheets keys: {error}")
+        return None
+
+    value_ranges = result.get('valueRanges', [])
+    ids = (value_ranges[0].get('values') or [[]])[0] if value_ranges else []
+    timestamps = (value_ranges[1].get('values') or [[]])[0] if len(value_ranges) > 1 else []
+
+    keys = []
+    for offset, value in enumerate(ids):
+        record_id = parse_sheet_id(value)
+        if record_id is None:
+            continue
+        last_updated = timestamps[offset] if offset < len(timestamps) else ''
+        keys.append((first_row + offset, record_id, last_updated))
+
+    logger.info(f"Fetched {len(keys)} keys from Google Sheets")
+    return pd.DataFrame(keys, columns=['row_number', 'id', 'last_updated'])
+
+
+def merge_row_ranges(row_numbers):
+    """Collapse row numbers into sorted, inclusive (start, end) runs of adjacent rows."""
+    runs = []
+    for row_number in sorted(set(row_numbers)):
+        if runs and row_number == runs[-1][1] + 1:
+            runs[-1][1] = row_number
+        else:
+            runs.append([row_number, row_number])
+    return [tuple(run) for run in runs]
+
+
+def fetch_sheets_rows(row_numbers):
+    """
+    Fetch full rows for the given sheet row numbers with a single batchGet.
+
+    The result has the same columns as fetch_sheets_data() and keeps its convention that the
+    sheet row number is index + 2. Returns None if the Sheets API call failed.
+    """
+    columns = ['id', 'first_name', 'last_name', 'status', 'region',
+               'sales_rep', 'follow_up', 'notes', 'last_updated']
+    runs = merge_row_ranges(row_numbers)
+    if not runs:
+        return pd.DataFrame(columns=columns)
+
+    sheet_name, _, _ = sheet_data_rows()
+    try:
+        sheets = authenticate_sheets()
+        result = sheets.values().batchGet(
+            spreadsheetId=SPREADSHEET_ID,
+            ranges=[f'{sheet_name}!A{start}:I{end}' for start, end in runs]
+        ).execute()
+    except HttpError as error:
+        logger.error(f"Error fetching Sheets rows: {error}")
+        return None
+
+    data, index = [], []
+    for (start, end), value_range in zip(runs, result.get('valueRanges', [])):
+        values = value_range.get('values', [])
+        for offset in range(end - start + 1):
+            row = values[offset] if offset < len(values) else []
+            data.append((row + [None] * len(columns))[:len(columns)])
+            index.append(start + offset - 2)
+
+    df = sheet_rows_to_dataframe(columns, data, index=index)
+    logger.info(f"Fetched {len(df)} rows in {len(runs)} ranges from Google Sheets")
+    return df
+
+
 def write_sheets_data(df):
     if df.empty:
         logger.error("Warning: Attempting to write an empty DataFrame to Sheets.")
@@ -146,17 +253,17 @@ def update_row_in_sheets(record: DataRecord):
     #     return False
 
     try:
-        df = fetch_sheets_data()
-        if df.empty:
+        keys = fetch_sheets_keys()
+        if keys is None or keys.empty:
             logger.error("Sheets data is empty.")
             return False
 
-        row_indices = df.index[df['id'] == record.id].tolist()
-        if not row_indices:
+        row_numbers = keys.loc[keys['id'] == record.id, 'row_number'].tolist()
+        if not row_numbers:
             logger.error(f"Record with id {record.id} not found.")
             return False
 
-        row_number = row_indices[0] + 2
+        row_number = row_numbers[0]
         sheets = authenticate_sheets()
         values = [format_data_for_sheets(record)]
         body = {
@@ -177,12 +284,14 @@ def update_row_in_sheets(record: DataRecord):
 
 def delete_row_from_sheets(record_id: int):
     try:
-        df = fetch_sheets_data()
-        row_indices = df.index[df['id'] == record_id].tolist()
-        if not row_indices:
+        keys = fetch_sheets_keys()
+        if keys is None:
+            return False
+        row_numbers = keys.loc[keys['id'] == record_id, 'row_number'].tolist()
+        if not row_numbers:
             logger.error(f"Record with ID {record_id} not found in Sheets.")
             return False
-        row_number = row_indices[0] + 2
+        row_number = row_numbers[0]
         sheets = authenticate_sheets()
         sheet_metadata = sheets.get(spreadsheetId=SPREADSHEET_ID).execute()
         sheet_id = sheet_metadata['sheets'][0]['properties']['sheetId']
@@ -208,3 +317,92 @@ def delete_row_from_sheets(record_id: int):
     except HttpError as error:
         logger.error(f"Error deleting row from Sheets: {error}")
         return False
+
+
+def is_complete_record(record: DataRecord):
+    return all([record.id, record.first_name, record.last_name, record.status,
+                record.region, record.sales_rep, record.follow_up, record.notes, record.last_updated])
+
+
+def add_rows_to_sheets(records):
+    """
+    Append a batch of records with a single append call.
+
+    Returns the ids of the records that were appended; incomplete records are skipped, and
+    nothing is appended if the call fails.
+    """
+    complete = [record for record in records if is_complete_record(record)]
+    if len(complete) < len(records):
+        logger.error(f"Skipping {len(records) - len(complete)} incomplete DataRecords.")
+    if not complete:
+        return []
+
+    try:
+        sheets = authenticate_sheets()
+        sheets.values().append(
+            spreadsheetId=SPREADSHEET_ID,
+            range=RANGE_NAME,
+            valueInputOption='RAW',
+            insertDataOption='INSERT_ROWS',
+            body={'values': [format_data_for_sheets(record) for record in complete]}
+        ).execute()
+        logger.info(f"Inserted {len(complete)} records in Sheets")
+        return [record.id for record in complete]
+    except HttpError as error:
+        logger.error(f"Error adding rows to Sheets: {error}")
+        return []
+
+
+def update_rows_in_sheets(rows):
+    """Overwrite a batch of (row_number, record) pairs with a single batchUpdate call."""
+    if not rows:
+        return True
+
+    sheet_name, _, _ = sheet_data_rows()
+    try:
+        sheets = authenticate_sheets()
+        sheets.values().batchUpdate(
+            spreadsheetId=SPREADSHEET_ID,
+            body={
+                'valueInputOption': 'RAW',
+                'data': [{'range': f'{sheet_name}!A{row_number}:I{row_number}',
+                          'values': [format_data_for_sheets(record)]}
+                         for row_number, record in rows]
+            }
+        ).execute()
+        logger.info(f"Updated {len(rows)} records in Sheets")
+        return True
+    except HttpError as error:
+        logger.error(f"Error updating rows in Sheets: {error}")
+        return False
+
+
+def delete_rows_from_sheets(row_numbers):
+    """Delete the given sheet rows with a single batchUpdate call."""
+    if not row_numbers:
+        return True
+
+    try:
+        sheets = authenticate_sheets()
+        sheet_metadata = sheets.get(spreadsheetId=SPREADSHEET_ID).execute()
+        sheet_id = sheet_metadata['sheets'][0]['properties']['sheetId']
+        # Bottom-up, so each deletion leaves the row numbers of the remaining ones intact
+        requests = [
+            {
+                "deleteDimension": {
+                    "range": {
+                        "sheetId": sheet_id,
+                        "dimension": "ROWS",
+                        "startIndex": row_number - 1,
+                        "endIndex": row_number
+                    }
+                }
+            }
+            for row_number in sorted(set(row_numbers), reverse=True)
+        ]
+        sheets.batchUpdate(spreadsheetId=SPREADSHEET_ID, body={"requests": requests}).execute()
+        logger.info(f"Deleted {len(requests)} rows from Sheets.")
+        return True
+    except HttpError as error:
+        logger.error(f"Error deleting rows from Sheets: {error}")
+        return False
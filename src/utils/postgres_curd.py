@@ -2,15 +2,20 @@
 Author: Ayush Bhandari
 Email: ayushbhandariofficial@gmail.com
 """
-from sqlalchemy import create_engine, Table, Column, Integer, String, Float, DateTime, MetaData
+from sqlalchemy import create_engine, Table, Column, Integer, String, Float, DateTime, MetaData, Index, and_, or_, \
+    tuple_, select, func, cast, literal_column, BigInteger, Sequence, text
 from sqlalchemy.orm import sessionmaker
 from src.postgresconnection.postgres_connection import get_postgres_engine
 from src.datamodels.model import DataRecord
 import pandas as pd
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.dialects.postgresql import insert, aggregate_order_by
+import io
+import threading
 from loguru import logger
+from src.utils.records_cache import bump_table_version
+from src.utils.change_listener import notify_table_changed, CHANGE_SEQUENCE
+from src.utils.change_feed import FILTER_COLUMNS
 
-engine = get_postgres_engine()
 metadata = MetaData()
 
 data_table = Table('google_sheet_data', metadata,
@@ -25,124 +30,539 @@ data_table = Table('google_sheet_data', metadata,
                    Column('last_updated', DateTime)
                    )
 
-metadata.create_all(engine)
+# Keyset pagination on GET /records walks (last_updated, id); the filtered variants lead with
+# the equality column so every page is a single index range scan.
+Index('ix_google_sheet_data_last_updated_id', data_table.c.last_updated, data_table.c.id)
+Index('ix_google_sheet_data_status_last_updated_id',
+      data_table.c.status, data_table.c.last_updated, data_table.c.id)
+Index('ix_google_sheet_data_region_last_updated_id',
+      data_table.c.region, data_table.c.last_updated, data_table.c.id)
+Index('ix_google_sheet_data_sales_rep_last_updated_id',
+      data_table.c.sales_rep, data_table.c.last_updated, data_table.c.id)
 
-Session = sessionmaker(bind=engine)
-session = Session()
+Sequence(CHANGE_SEQUENCE, metadata=metadata)
+
+# Plain str: the keys are SQLAlchemy quoted_name objects, which orjson refuses as dict keys
+RECORD_COLUMNS = [str(column) for column in data_table.columns.keys()]
+
+# Nothing here touches the database at import time: the engine is created on first use, and
+# the schema by init_postgres_schema() during startup warm-up.
+Session = sessionmaker()
+_engine = None
+_init_lock = threading.Lock()
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _init_lock:
+            if _engine is None:
+                _engine = get_postgres_engine()
+    return _engine
+
+
+def get_session():
+    """
+    Return a new session for one call. Use it as a context manager so its connection goes back
+    to the pool.
+
+    Endpoints run in the threadpool while the sync runs in its own thread, so sessions are never
+    shared. Otherwise one caller's commit or rollback would end another's transaction.
+    """
+    return Session(bind=get_engine())
+
+
+def init_postgres_schema():
+    engine = get_engine()
+    metadata.create_all(engine)
+    # create_all() skips tables that already exist, indexes included
+    for index in data_table.indexes:
+        index.create(engine, checkfirst=True)
 
 
 def fetch_postgres_data():
-    try:
-        query = data_table.select()
-        result = session.execute(query).fetchall()
+    with get_session() as session:
+        try:
+            query = data_table.select()
+            result = session.execute(query).fetchall()
+
+            if not result:
+                return pd.DataFrame(columns=[
+                    'id', 'first_name', 'last_name', 'status', 'region',
+                    'sales_rep', 'follow_up', 'notes', 'last_updated'
+                ])
+
+            # Retrieve column names from data_table
+            column_names = data_table.columns.keys()
+
+            # Create DataFrame with dynamic column names
+            df = pd.DataFrame(result, columns=column_names)
+            logger.info(f"Fetched {len(df)} records from postgres")
+            return df
+        except Exception as e:
+            logger.error(f"Error fetching PostgreSQL data: {e}")
+            return pd.DataFrame()
+
+
+def fetch_postgres_rows():
+    """Return every record as a tuple in RECORD_COLUMNS order, or None on failure."""
+    with get_session() as session:
+        try:
+            result = session.execute(data_table.select()).all()
+            logger.info(f"Fetched {len(result)} records from postgres")
+            return result
+        except Exception as e:
+            logger.error(f"Error fetching PostgreSQL data: {e}")
+            session.rollback()
+            return None
+
+
+def postgres_record_exists(record_id: int):
+    with get_session() as session:
+        query = select(data_table.c.id).where(data_table.c.id == record_id)
+        return session.execute(query).first() is not None
+
+
+def query_postgres_records(status=None, region=None, sales_rep=None, updated_since=None, updated_until=None,
+                           after=None, limit=1000):
+    """
+    Fetch one page of records, as tuples in RECORD_COLUMNS order, ordered by (last_updated, id).
+
+    after is the (last_updated, id) of the last row of the previous page. Rows without a
+    last_updated sort last, as they do in the indexes. The walk has two phases so that each
+    query is a single index range: first the rows with a last_updated, by row comparison on
+    (last_updated, id), then the rows without one, by id. A page that reaches the end of the
+    first phase is filled from the start of the second.
+    """
+    last_updated, record_id = data_table.c.last_updated, data_table.c.id
+    conditions = []
+    if status is not None:
+        conditions.append(data_table.c.status == status)
+    if region is not None:
+        conditions.append(data_table.c.region == region)
+    if sales_rep is not None:
+        conditions.append(data_table.c.sales_rep == sales_rep)
+    if updated_since is not None:
+        conditions.append(last_updated >= updated_since)
+    if updated_until is not None:
+        conditions.append(last_updated < updated_until)
+
+    def page_query(phase_conditions, page_limit):
+        return data_table.select().where(*conditions, *phase_conditions) \
+            .order_by(last_updated, record_id).limit(page_limit)
+
+    after_updated, after_id = after if after is not None else (None, None)
+    with get_session() as session:
+        if after is None or after_updated is not None:
+            dated = [last_updated.isnot(None)]
+            if after is not None:
+                dated.append(tuple_(last_updated, record_id) > tuple_(after_updated, after_id))
+            result = session.execute(page_query(dated, limit)).all()
+            # A last_updated range can't match undated rows, so there is no second phase
+            if len(result) < limit and updated_since is None and updated_until is None:
+                result += session.execute(page_query([last_updated.is_(None)], limit - len(result))).all()
+        else:
+            result = session.execute(page_query([last_updated.is_(None), record_id > after_id], limit)).all()
+    logger.info(f"Fetched page of {len(result)} records from postgres")
+    return result
+
+
+def id_ranges_condition(ranges):
+    # ranges are half-open (start, end) id intervals
+    return or_(*[and_(data_table.c.id >= start, data_table.c.id < end) for start, end in ranges])
+
+
+def fetch_postgres_block_checksums(block_size, ranges=None):
+    """
+    Return {block: md5} for the id blocks [block * block_size, (block + 1) * block_size).
+
+    Each checksum covers 'id|last_updated' of the block's rows joined with ',' in id order,
+    the same string merkle_sync builds from the Sheets keys. Returns None on failure.
+    """
+    with get_session() as session:
+        try:
+            block = cast(func.floor(cast(data_table.c.id, Float) / block_size), BigInteger).label('block')
+            row_key = func.concat(data_table.c.id, '|', func.coalesce(
+                func.to_char(data_table.c.last_updated, 'YYYY-MM-DD HH24:MI:SS'), ''))
+            checksum = func.md5(func.string_agg(row_key, aggregate_order_by(literal_column("','"), data_table.c.id)))
+            query = select(block, checksum.label('checksum')).group_by(block)
+            if ranges is not None:
+                query = query.where(id_ranges_condition(ranges))
+            result = session.execute(query).fetchall()
+            return {row.block: row.checksum for row in result}
+        except Exception as e:
+            logger.error(f"Error fetching PostgreSQL block checksums: {e}")
+            session.rollback()
+            return None
+
+
+def fetch_postgres_data_in_ranges(ranges):
+    with get_session() as session:
+        try:
+            query = data_table.select().where(id_ranges_condition(ranges))
+            result = session.execute(query).fetchall()
+            df = pd.DataFrame(result, columns=data_table.columns.keys())
+            logger.info(f"Fetched {len(df)} records in {len(ranges)} id ranges from postgres")
+            return df
+        except Exception as e:
+            logger.error(f"Error fetching PostgreSQL data: {e}")
+            session.rollback()
+            return None
+
+
+def fetch_postgres_keys():
+    """Return {id: last_updated} for every record, or None on failure."""
+    with get_session() as session:
+        try:
+            query = select(data_table.c.id, data_table.c.last_updated)
+            result = session.execute(query).fetchall()
+            logger.info(f"Fetched {len(result)} keys from postgres")
+            return {row.id: row.last_updated for row in result}
+        except Exception as e:
+            logger.error(f"Error fetching PostgreSQL keys: {e}")
+            session.rollback()
+            return None
 
-        if not result:
-            return pd.DataFrame(columns=[
-                'id', 'first_name', 'last_name', 'status', 'region',
-                'sales_rep', 'follow_up', 'notes', 'last_updated'
-            ])
 
-        # Retrieve column names from data_table
-        column_names = data_table.columns.keys()
+def fetch_postgres_data_by_ids(ids):
+    with get_session() as session:
+        try:
+            query = data_table.select().where(data_table.c.id.in_(list(ids)))
+            result = session.execute(query).fetchall()
+            df = pd.DataFrame(result, columns=data_table.columns.keys())
+            logger.info(f"Fetched {len(df)} records by id from postgres")
+            return df
+        except Exception as e:
+            logger.error(f"Error fetching PostgreSQL data: {e}")
+            session.rollback()
+            return None
 
-        # Create DataFrame with dynamic column names
-        df = pd.DataFrame(result, columns=column_names)
-        logger.info(f"Fetched {len(df)} records from postgres")
-        return df
-    except Exception as e:
-        logger.error(f"Error fetching PostgreSQL data: {e}")
-        return pd.DataFrame()
+
+def stream_postgres_records(chunk_size):
+    """
+    Yield every record ordered by id through a server-side cursor, chunk_size rows at a time.
+
+    Uses its own connection so the session stays free for writes while the stream is open.
+    """
+    with get_engine().connect() as connection:
+        query = data_table.select().order_by(data_table.c.id)
+        result = connection.execution_options(stream_results=True, yield_per=chunk_size).execute(query)
+        for row in result:
+            yield row
+
+
+RETURNED_COLUMNS = list(data_table.c)
+# xmax is 0 for a freshly inserted row and set when ON CONFLICT DO UPDATE hit an existing one
+UPSERT_INSERTED = literal_column('(xmax = 0)').label('inserted')
+
+
+def fetch_previous_values(session, record_ids):
+    """Lock the rows about to be updated and return {id: {filter column: value}} as they are now."""
+    query = select(data_table.c.id, *[data_table.c[column] for column in FILTER_COLUMNS]) \
+        .where(data_table.c.id.in_(list(record_ids))).order_by(data_table.c.id).with_for_update()
+    return {row.id: {column: row._mapping[column] for column in FILTER_COLUMNS}
+            for row in session.execute(query)}
+
+
+def row_changes(op, rows, previous=None):
+    """
+    Turn RETURNING rows into (op, id, record, previous) changes; op None means an upsert.
+
+    previous is the fetch_previous_values() result for updates. Writers NOTIFY these in their
+    transaction. Change feed events reach every worker, the writing one included, through the
+    change listener.
+    """
+    column_names = data_table.columns.keys()
+    changes = []
+    for row in rows:
+        mapping = row._mapping
+        row_op = op or ('insert' if mapping['inserted'] else 'update')
+        row_previous = previous.get(mapping['id']) if previous and row_op == 'update' else None
+        changes.append((row_op, mapping['id'], {column: mapping[column] for column in column_names}, row_previous))
+    return changes
+
+
+def invalidate_cached_records(changes):
+    # Only an actual mutation invalidates cached /records responses: an UPDATE or DELETE that
+    # matched nothing, or a reconcile that found no differences, leaves them valid
+    if changes:
+        bump_table_version()
 
 
 def insert_postgres_record(record: DataRecord):
-    try:
-        query = data_table.insert().values(
-            id=record.id,
-            first_name=record.first_name,
-            last_name=record.last_name,
-            status=record.status,
-            region=record.region,
-            sales_rep=record.sales_rep,
-            follow_up=record.follow_up,
-            notes=record.notes,
-            last_updated=record.last_updated
-        )
-        session.execute(query)
-        session.commit()
-        logger.info(f"Inserted record in postgres with id: {record.id}")
-        return True
-    except Exception as e:
-        logger.error(f"Error inserting into PostgreSQL: {e}")
-        session.rollback()
-        return False
+    with get_session() as session:
+        try:
+            query = data_table.insert().values(
+                id=record.id,
+                first_name=record.first_name,
+                last_name=record.last_name,
+                status=record.status,
+                region=record.region,
+                sales_rep=record.sales_rep,
+                follow_up=record.follow_up,
+                notes=record.notes,
+                last_updated=record.last_updated
+            )
+            rows = session.execute(query.returning(*RETURNED_COLUMNS)).fetchall()
+            changes = row_changes('insert', rows)
+            notify_table_changed(session, changes)
+            session.commit()
+            invalidate_cached_records(changes)
+            logger.info(f"Inserted record in postgres with id: {record.id}")
+            return True
+        except Exception as e:
+            logger.error(f"Error inserting into PostgreSQL: {e}")
+            session.rollback()
+            return False
 
 
 def update_postgres_record(record: DataRecord):
-    try:
-        query = data_table.update().where(data_table.c.id == record.id).values(
-            first_name=record.first_name,
-            last_name=record.last_name,
-            status=record.status,
-            region=record.region,
-            sales_rep=record.sales_rep,
-            follow_up=record.follow_up,
-            notes=record.notes,
-            last_updated=record.last_updated
-        )
-        session.execute(query)
-        session.commit()
-        logger.info(f"Updated record in postgres with id: {record.id}")
-        return True
-    except Exception as e:
-        logger.error(f"Error updating PostgreSQL: {e}")
-        session.rollback()
-        return False
+    with get_session() as session:
+        try:
+            query = data_table.update().where(data_table.c.id == record.id).values(
+                first_name=record.first_name,
+                last_name=record.last_name,
+                status=record.status,
+                region=record.region,
+                sales_rep=record.sales_rep,
+                follow_up=record.follow_up,
+                notes=record.notes,
+                last_updated=record.last_updated
+            )
+            previous = fetch_previous_values(session, [record.id])
+            rows = session.execute(query.returning(*RETURNED_COLUMNS)).fetchall()
+            changes = row_changes('update', rows, previous)
+            notify_table_changed(session, changes)
+            session.commit()
+            invalidate_cached_records(changes)
+            logger.info(f"Updated record in postgres with id: {record.id}")
+            return True
+        except Exception as e:
+            logger.error(f"Error updating PostgreSQL: {e}")
+            session.rollback()
+            return False
 
 
 def delete_postgres_record(record_id: int):
-    try:
-        query = data_table.delete().where(data_table.c.id == record_id)
-        session.execute(query)
-        session.commit()
-        logger.info(f"Deleted record from postgres with id: {record_id}")
-        return True
-    except Exception as e:
-        logger.error(f"Error deleting from PostgreSQL: {e}")
-        session.rollback()
-        return False
+    with get_session() as session:
+        try:
+            query = data_table.delete().where(data_table.c.id == record_id)
+            rows = session.execute(query.returning(*RETURNED_COLUMNS)).fetchall()
+            changes = row_changes('delete', rows)
+            notify_table_changed(session, changes)
+            session.commit()
+            invalidate_cached_records(changes)
+            logger.info(f"Deleted record from postgres with id: {record_id}")
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting from PostgreSQL: {e}")
+            session.rollback()
+            return False
 
 
 def upsert_postgres_record(record: DataRecord):
-    try:
-        stmt = insert(data_table).values(
-            id=record.id,
-            first_name=record.first_name,
-            last_name=record.last_name,
-            status=record.status,
-            region=record.region,
-            sales_rep=record.sales_rep,
-            follow_up=record.follow_up,
-            notes=record.notes,
-            last_updated=record.last_updated
-        )
-        stmt = stmt.on_conflict_do_update(
-            index_elements=['id'],
-            set_={
-                'first_name': stmt.excluded.first_name,
-                'last_name': stmt.excluded.last_name,
-                'status': stmt.excluded.status,
-                'region': stmt.excluded.region,
-                'sales_rep': stmt.excluded.sales_rep,
-                'follow_up': stmt.excluded.follow_up,
-                'notes': stmt.excluded.notes,
-                'last_updated': stmt.excluded.last_updated
-            }
+    with get_session() as session:
+        try:
+            stmt = insert(data_table).values(
+                id=record.id,
+                first_name=record.first_name,
+                last_name=record.last_name,
+                status=record.status,
+                region=record.region,
+                sales_rep=record.sales_rep,
+                follow_up=record.follow_up,
+                notes=record.notes,
+                last_updated=record.last_updated
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['id'],
+                set_={
+                    'first_name': stmt.excluded.first_name,
+                    'last_name': stmt.excluded.last_name,
+                    'status': stmt.excluded.status,
+                    'region': stmt.excluded.region,
+                    'sales_rep': stmt.excluded.sales_rep,
+                    'follow_up': stmt.excluded.follow_up,
+                    'notes': stmt.excluded.notes,
+                    'last_updated': stmt.excluded.last_updated
+                }
+            )
+            previous = fetch_previous_values(session, [record.id])
+            rows = session.execute(stmt.returning(*RETURNED_COLUMNS, UPSERT_INSERTED)).fetchall()
+            changes = row_changes(None, rows, previous)
+            notify_table_changed(session, changes)
+            session.commit()
+            invalidate_cached_records(changes)
+            logger.info(f"Upserted record from postgres with id: {record.id}")
+            return True
+        except Exception as e:
+            logger.error(f"Error upserting into PostgreSQL: {e}")
+            session.rollback()
+            return False
+
+
+def upsert_postgres_records(records):
+    """Upsert a batch of records with a single INSERT ... ON CONFLICT statement."""
+    with get_session() as session:
+        if not records:
+            return True
+        try:
+            stmt = insert(data_table).values([record.dict() for record in records])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['id'],
+                set_={
+                    'first_name': stmt.excluded.first_name,
+                    'last_name': stmt.excluded.last_name,
+                    'status': stmt.excluded.status,
+                    'region': stmt.excluded.region,
+                    'sales_rep': stmt.excluded.sales_rep,
+                    'follow_up': stmt.excluded.follow_up,
+                    'notes': stmt.excluded.notes,
+                    'last_updated': stmt.excluded.last_updated
+                }
+            )
+            previous = fetch_previous_values(session, [record.id for record in records])
+            rows = session.execute(stmt.returning(*RETURNED_COLUMNS, UPSERT_INSERTED)).fetchall()
+            changes = row_changes(None, rows, previous)
+            notify_table_changed(session, changes)
+            session.commit()
+            invalidate_cached_records(changes)
+            logger.info(f"Upserted {len(records)} records in postgres")
+            return True
+        except Exception as e:
+            logger.error(f"Error upserting into PostgreSQL: {e}")
+            session.rollback()
+            return False
+
+
+def delete_postgres_records(record_ids):
+    with get_session() as session:
+        if not record_ids:
+            return True
+        try:
+            query = data_table.delete().where(data_table.c.id.in_(list(record_ids)))
+            rows = session.execute(query.returning(*RETURNED_COLUMNS)).fetchall()
+            changes = row_changes('delete', rows)
+            notify_table_changed(session, changes)
+            session.commit()
+            invalidate_cached_records(changes)
+            logger.info(f"Deleted {len(record_ids)} records from postgres")
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting from PostgreSQL: {e}")
+            session.rollback()
+            return False
+
+
+DATA_COLUMNS = [column for column in RECORD_COLUMNS if column not in ('id', 'last_updated')]
+
+
+def reconcile_sql():
+    columns = ', '.join(RECORD_COLUMNS)
+    sheet_columns = ', '.join(f's.{column}' for column in RECORD_COLUMNS)
+    postgres_columns = ', '.join(f'p.{column}' for column in RECORD_COLUMNS)
+    upserted_columns = ', '.join(f'u.{column}' for column in RECORD_COLUMNS)
+    deleted_sheet_columns = ', '.join('d.id' if column == 'id' else f'NULL AS {column}' for column in RECORD_COLUMNS)
+    sheet_data = ', '.join(f's.{column}' for column in DATA_COLUMNS)
+    postgres_data = ', '.join(f'p.{column}' for column in DATA_COLUMNS)
+    set_columns = ', '.join(f'{column} = EXCLUDED.{column}' for column in RECORD_COLUMNS if column != 'id')
+    # The main query sees google_sheet_data as it was before the upsert, so o holds the old values
+    previous_columns = ', '.join(f'o.{column} AS previous_{column}' for column in FILTER_COLUMNS)
+    no_previous_columns = ', '.join(f'NULL AS previous_{column}' for column in FILTER_COLUMNS)
+    # Same rules as reconcile.apply_changes: the newer last_updated wins, a Sheets-only record
+    # moves to PostgreSQL and a PostgreSQL-only record moves to Sheets. The data-modifying CTE
+    # applies the PostgreSQL side; the final SELECT returns what Sheets still needs. PostgreSQL-only
+    # records are left in place here: they are deleted only once the append to Sheets succeeded.
+    return f"""
+        WITH sheet AS (
+            SELECT DISTINCT ON (id) row_number, {columns}
+            FROM sheet_snapshot WHERE id IS NOT NULL ORDER BY id, row_number
+        ),
+        diff AS (
+            SELECT s.row_number, coalesce(s.id, p.id) AS id,
+                   CASE
+                       WHEN p.id IS NULL THEN 'sheets_only'
+                       WHEN s.id IS NULL THEN 'postgres_only'
+                       WHEN s.last_updated > p.last_updated THEN 'sheets_newer'
+                       WHEN p.last_updated > s.last_updated THEN 'postgres_newer'
+                   END AS action
+            FROM sheet s
+            FULL OUTER JOIN google_sheet_data p ON p.id = s.id
+            WHERE p.id IS NULL OR s.id IS NULL
+               OR (s.last_updated, {sheet_data}) IS DISTINCT FROM (p.last_updated, {postgres_data})
+        ),
+        upserted AS (
+            INSERT INTO google_sheet_data ({columns})
+            SELECT {sheet_columns} FROM sheet s JOIN diff d ON d.id = s.id
+            WHERE d.action IN ('sheets_only', 'sheets_newer')
+            ON CONFLICT (id) DO UPDATE SET {set_columns}
+            RETURNING {columns}, (xmax = 0) AS inserted
         )
-        session.execute(stmt)
-        session.commit()
-        logger.info(f"Upserted record from postgres with id: {record.id}")
-        return True
-    except Exception as e:
-        logger.error(f"Error upserting into PostgreSQL: {e}")
-        session.rollback()
-        return False
+        SELECT CASE WHEN inserted THEN 'insert' ELSE 'update' END AS action, NULL::integer AS row_number,
+               {upserted_columns}, {previous_columns}
+        FROM upserted u LEFT JOIN google_sheet_data o ON o.id = u.id
+        UNION ALL
+        SELECT CASE WHEN d.action = 'postgres_only' THEN 'append_sheets' ELSE 'update_sheets' END,
+               d.row_number, {postgres_columns}, {no_previous_columns}
+        FROM diff d JOIN google_sheet_data p ON p.id = d.id WHERE d.action IN ('postgres_only', 'postgres_newer')
+        UNION ALL
+        SELECT 'delete_sheets', d.row_number, {deleted_sheet_columns}, {no_previous_columns}
+        FROM diff d WHERE d.action = 'sheets_only'
+    """
+
+
+def copy_text_value(value):
+    if value is None:
+        return '\\N'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def reconcile_sheet_snapshot(sheet_rows):
+    """
+    Diff a Sheets snapshot against google_sheet_data inside PostgreSQL and apply the PostgreSQL side.
+
+    sheet_rows are (row_number, *RECORD_COLUMNS) tuples. The snapshot is COPYed into a temp table
+    and compared with one FULL OUTER JOIN statement. Returns (action, row_number, record) for the
+    changes Sheets still needs, where action is update_sheets, append_sheets or delete_sheets,
+    or None on failure. append_sheets records are still in PostgreSQL; the caller deletes them
+    once they are in Sheets.
+    """
+    with get_session() as session:
+        try:
+            # Same columns and types as google_sheet_data, plus the sheet row number
+            dialect = session.bind.dialect
+            column_definitions = ', '.join(f'{column} {data_table.c[column].type.compile(dialect=dialect)}'
+                                           for column in RECORD_COLUMNS)
+            session.execute(text(f"CREATE TEMP TABLE sheet_snapshot (row_number integer, {column_definitions}) "
+                                 f"ON COMMIT DROP"))
+
+            buffer = io.StringIO()
+            for row in sheet_rows:
+                buffer.write('\t'.join(copy_text_value(value) for value in row) + '\n')
+            buffer.seek(0)
+            with session.connection().connection.driver_connection.cursor() as cursor:
+                cursor.copy_expert(f"COPY sheet_snapshot (row_number, {', '.join(RECORD_COLUMNS)}) FROM STDIN",
+                                   buffer)
+
+            result = session.execute(text(reconcile_sql())).fetchall()
+            postgres_changes, sheets_changes = [], []
+            for row in result:
+                mapping = row._mapping
+                record = {column: mapping[column] for column in RECORD_COLUMNS}
+                if row.action in ('insert', 'update'):
+                    previous = {column: mapping[f'previous_{column}'] for column in FILTER_COLUMNS} \
+                        if row.action == 'update' else None
+                    postgres_changes.append((row.action, row.id, record, previous))
+                else:
+                    sheets_changes.append((row.action, row.row_number, record))
+
+            notify_table_changed(session, postgres_changes)
+            session.commit()
+            invalidate_cached_records(postgres_changes)
+            logger.info(f"Applied {len(postgres_changes)} changes in postgres; "
+                        f"{len(sheets_changes)} changes left for Sheets")
+            return sheets_changes
+        except Exception as e:
+            logger.error(f"Error reconciling in PostgreSQL: {e}")
+            session.rollback()
+            return None
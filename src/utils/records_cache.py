@@ -0,0 +1,108 @@
+"""
+Author: Ayush Bhandari
+Email: ayushbhandariofficial@gmail.com
+"""
+import hashlib
+import os
+import threading
+from collections import namedtuple
+from src.utils.records_serializer import compress
+
+# Serialized responses are only valid for the table version they were built from.
+# Every write to google_sheet_data (CRUD endpoints and the sync engine both go through
+# src/utils/postgres_curd.py) bumps the version, which drops all cached entries.
+# encoded holds compressed variants of body, filled in on first request for each encoding
+CachedResponse = namedtuple('CachedResponse', ['version', 'etag', 'body', 'headers', 'encoded'])
+
+# Filtered / paginated queries are cached per query string, so bound both the number of entries and
+# their total size per worker, compressed variants included. A body larger than the whole budget
+# (the unfiltered table has ~210 MB of JSON at 1M rows) is served but not cached.
+MAX_CACHED_RESPONSES = 256
+MAX_CACHED_BYTES = int(os.getenv('RECORDS_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+
+_lock = threading.Lock()
+_table_version = 0
+_responses = {}
+
+
+def get_table_version():
+    return _table_version
+
+
+def bump_table_version():
+    global _table_version
+    with _lock:
+        _table_version += 1
+        _responses.clear()
+        return _table_version
+
+
+def make_etag(body: bytes):
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def get_cached_response(key):
+    with _lock:
+        cached = _responses.get(key)
+        if cached is not None and cached.version == _table_version:
+            return cached
+        return None
+
+
+def response_size(cached):
+    return len(cached.body) + sum(len(body) for body in cached.encoded.values())
+
+
+def _evict(keep):
+    """Drop the oldest entries other than keep until the cache is within its limits; needs _lock."""
+    total = sum(response_size(cached) for cached in _responses.values())
+    for key in list(_responses):
+        if total <= MAX_CACHED_BYTES and len(_responses) <= MAX_CACHED_RESPONSES:
+            break
+        if _responses[key] is not keep:
+            total -= response_size(_responses.pop(key))
+
+
+def store_cached_response(key, version, body: bytes, headers=None):
+    """Cache body for key unless the table changed since version was read or it exceeds the budget."""
+    cached = CachedResponse(version, make_etag(body), body, headers or {}, {})
+    if len(body) > MAX_CACHED_BYTES:
+        return cached
+    with _lock:
+        if version == _table_version:
+            _responses.pop(key, None)
+            _responses[key] = cached
+            _evict(cached)
+    return cached
+
+
+def encoded_body(cached, encoding):
+    body = cached.encoded.get(encoding)
+    if body is None:
+        body = compress(cached.body, encoding)
+        with _lock:
+            # Keep the variant only if the entry still fits the budget with it
+            if response_size(cached) + len(body) <= MAX_CACHED_BYTES:
+                cached.encoded[encoding] = body
+                _evict(cached)
+    return body
+
+
+def encoded_etag(etag, encoding):
+    # A strong ETag identifies the exact bytes, so each content-coding gets its own
+    return etag if encoding is None else f'{etag[:-1]}-{encoding}"'
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        # If-None-Match uses the weak comparison function (RFC 9110, 13.1.2)
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
@@ -0,0 +1,51 @@
+"""
+Author: Ayush Bhandari
+Email: ayushbhandariofficial@gmail.com
+"""
+import gzip
+import orjson
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; without it responses fall back to gzip
+    brotli = None
+
+# Bodies smaller than this aren't worth the compression CPU
+COMPRESSION_MIN_SIZE = 1024
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 5
+
+
+def serialize_records(columns, rows):
+    """Serialize DB row tuples straight to JSON bytes; datetimes are encoded natively as ISO 8601."""
+    return orjson.dumps([dict(zip(columns, row)) for row in rows])
+
+
+def choose_encoding(accept_encoding):
+    """Pick br or gzip from an Accept-Encoding header, or None for identity."""
+    if not accept_encoding:
+        return None
+    accepted, refused = set(), set()
+    for token in accept_encoding.split(','):
+        coding, _, params = token.strip().partition(';')
+        coding, params = coding.strip().lower(), params.replace(' ', '')
+        if params.startswith('q='):
+            try:
+                if float(params[2:]) == 0:
+                    refused.add(coding)
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding)
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    # * only stands for codings the header doesn't name, so gzip;q=0 still rules gzip out
+    if 'gzip' in accepted or ('*' in accepted and 'gzip' not in refused):
+        return 'gzip'
+    return None
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
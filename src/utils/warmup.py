@@ -0,0 +1,87 @@
+"""
+Author: Ayush Bhandari
+Email: ayushbhandariofficial@gmail.com
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from loguru import logger
+from src.utils.postgres_curd import get_engine, init_postgres_schema
+from src.gsheetsconnection.oauth import load_sheets_client
+
+# Budgets for importing main (no I/O at all) and for the warm-up below; exceeding them is logged.
+# Measured on 1 vCPU (python -X importtime -c "import main"): 1.2-1.3s warm, about 1.9s with a cold
+# page cache, mostly fastapi 0.47s, pandas 0.27s, googleapiclient 0.15s and sqlalchemy 0.14s. The
+# Postgres warm-up took 0.17-0.19s against a local server.
+IMPORT_TIME_TARGET = 1.5
+STARTUP_TIME_TARGET = 5.0
+WARMUP_RETRY_DELAY = 5
+
+readiness = {
+    'postgres': False,
+    'sheets': False,
+    'import_seconds': None,
+    'postgres_seconds': None,
+    'sheets_seconds': None,
+    'startup_seconds': None,
+}
+
+
+def record_import_time(seconds):
+    readiness['import_seconds'] = round(seconds, 3)
+    if seconds > IMPORT_TIME_TARGET:
+        logger.warning(f"Import took {seconds:.3f}s, above the {IMPORT_TIME_TARGET}s target.")
+    else:
+        logger.info(f"Import took {seconds:.3f}s.")
+
+
+def is_ready():
+    # The API (/records, CRUD, change feed) only needs Postgres. Sheets only gates the sync loop,
+    # so a Google outage or a revoked token doesn't take the API out of rotation.
+    return readiness['postgres']
+
+
+def warm_postgres():
+    init_postgres_schema()
+    engine = get_engine()
+    # Open the whole pool at once so the first requests don't pay for connection setup
+    pool_size = engine.pool.size()
+    with ThreadPoolExecutor(max_workers=pool_size) as executor:
+        connections = list(executor.map(lambda _: engine.connect(), range(pool_size)))
+    for connection in connections:
+        connection.close()
+
+
+def warm_sheets():
+    # Loads the shared credentials and discovery document every thread's Sheets client is built
+    # on; never opens a browser
+    load_sheets_client()
+
+
+async def warm_step(name, warm, on_ready=None):
+    started = time.perf_counter()
+    while True:
+        try:
+            await asyncio.to_thread(warm)
+            break
+        except Exception as e:
+            logger.error(f"Warm-up of {name} failed, retrying in {WARMUP_RETRY_DELAY}s: {e}")
+            await asyncio.sleep(WARMUP_RETRY_DELAY)
+    readiness[name] = True
+    readiness[f'{name}_seconds'] = round(time.perf_counter() - started, 3)
+    logger.info(f"{name} is ready after {readiness[f'{name}_seconds']}s.")
+    if on_ready is not None:
+        on_ready()
+
+
+async def warm_up(on_postgres_ready=None, on_sheets_ready=None):
+    """Warm up Postgres and Sheets concurrently, retrying each until it succeeds."""
+    started = time.perf_counter()
+    await asyncio.gather(warm_step('postgres', warm_postgres, on_postgres_ready),
+                         warm_step('sheets', warm_sheets, on_sheets_ready))
+    seconds = time.perf_counter() - started
+    readiness['startup_seconds'] = round(seconds, 3)
+    if seconds > STARTUP_TIME_TARGET:
+        logger.warning(f"Startup warm-up took {seconds:.3f}s, above the {STARTUP_TIME_TARGET}s target.")
+    else:
+        logger.info(f"Startup warm-up took {seconds:.3f}s.")
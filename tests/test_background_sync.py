@@ -0,0 +1,33 @@
+"""
+Author: Ayush Bhandari
+Email: ayushbhandariofficial@gmail.com
+"""
+import asyncio
+import threading
+import time
+from src.syncfunctions import sync
+
+
+def test_cancel_waits_for_running_sync_before_releasing_leadership(monkeypatch):
+    calls = []
+    sync_started = threading.Event()
+
+    def sync_all():
+        sync_started.set()
+        time.sleep(0.2)
+        calls.append('sync finished')
+        return "Synchronization complete."
+
+    monkeypatch.setattr(sync, 'try_acquire_leadership', lambda: True)
+    monkeypatch.setattr(sync, 'release_leadership', lambda: calls.append('released'))
+    monkeypatch.setattr(sync, 'sync_all', sync_all)
+
+    async def scenario():
+        task = asyncio.create_task(sync.background_sync_task())
+        await asyncio.to_thread(sync_started.wait)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return task.cancelled()
+
+    assert asyncio.run(scenario())
+    assert calls == ['sync finished', 'released']
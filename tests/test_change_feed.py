@@ -0,0 +1,86 @@
+"""
+Author: Ayush Bhandari
+Email: ayushbhandariofficial@gmail.com
+"""
+import asyncio
+import threading
+from src.utils.change_feed import ChangeHub
+
+
+def drain(subscriber):
+    events = []
+    while not subscriber.queue.empty():
+        event = subscriber.queue.get_nowait()
+        events.append(event if event is None else event['seq'])
+    return events
+
+
+def run(coroutine_function):
+    return asyncio.run(coroutine_function())
+
+
+def test_resume_replays_after_last_event_id_in_delivery_order():
+    async def scenario():
+        hub = ChangeHub()
+        hub.subscribe()
+        # Concurrent writers may commit out of sequence order
+        for seq in (1, 3, 2, 4):
+            hub.publish(seq, 'update', seq)
+        await asyncio.sleep(0)
+        return drain(hub.subscribe(last_seq=3))
+
+    assert run(scenario) == [2, 4]
+
+
+def test_resume_does_not_duplicate_an_event_published_from_another_thread():
+    async def scenario():
+        hub = ChangeHub()
+        hub.subscribe()
+        hub.publish(1, 'insert', 1)
+        await asyncio.sleep(0)
+        # The listener thread publishes; a client resumes before the loop ran the delivery
+        publisher = threading.Thread(target=hub.publish, args=(2, 'update', 1))
+        publisher.start()
+        publisher.join()
+        subscriber = hub.subscribe(last_seq=1)
+        await asyncio.sleep(0)
+        return drain(subscriber)
+
+    assert run(scenario) == [2]
+
+
+def test_resume_from_unknown_event_id_resets():
+    async def scenario():
+        hub = ChangeHub()
+        hub.publish(7, 'insert', 1)
+        subscriber = hub.subscribe(last_seq=5)
+        return subscriber.reset, drain(subscriber)
+
+    assert run(scenario) == (True, [])
+
+
+def test_reset_clears_history_and_interrupts_subscribers():
+    async def scenario():
+        hub = ChangeHub()
+        subscriber = hub.subscribe()
+        hub.publish(1, 'insert', 1)
+        hub.reset()
+        await asyncio.sleep(0)
+        return drain(subscriber), hub.subscribe(last_seq=1).reset
+
+    assert run(scenario) == ([1, None], True)
+
+
+def test_subscriber_matches_old_or_new_values():
+    async def scenario():
+        hub = ChangeHub()
+        subscriber = hub.subscribe({'status': 'open'})
+        record = {'id': 1, 'status': 'won', 'region': 'north', 'sales_rep': 'rep'}
+        hub.publish(1, 'update', 1, record, {'status': 'open', 'region': 'north', 'sales_rep': 'rep'})
+        hub.publish(2, 'update', 1, {**record, 'status': 'lost'},
+                    {'status': 'won', 'region': 'north', 'sales_rep': 'rep'})
+        hub.publish(3, 'insert', 2, {**record, 'id': 2, 'status': 'open'})
+        await asyncio.sleep(0)
+        return drain(subscriber)
+
+    assert run(scenario) == [1, 3]
@@ -0,0 +1,41 @@
+"""
+Author: Ayush Bhandari
+Email: ayushbhandariofficial@gmail.com
+"""
+import pickle
+import threading
+from datetime import datetime, timedelta
+from google.oauth2.credentials import Credentials
+from src.gsheetsconnection import oauth
+
+
+def test_threads_share_credentials_but_not_clients(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(oauth, '_credentials', None)
+    monkeypatch.setattr(oauth, '_discovery_document', None)
+    monkeypatch.setattr(oauth, '_local', threading.local())
+    with open(f'token_{oauth.SHEETS_API_NAME}_{oauth.SHEETS_API_VERSION}.pickle', 'wb') as token:
+        pickle.dump(Credentials(token='token', expiry=datetime.utcnow() + timedelta(hours=1)), token)
+    loads = []
+    load_credentials = oauth.load_credentials
+
+    def counting_load_credentials(*args, **kwargs):
+        loads.append(args)
+        return load_credentials(*args, **kwargs)
+
+    monkeypatch.setattr(oauth, 'load_credentials', counting_load_credentials)
+
+    # Warm-up loads the shared parts in one thread; the clients are built in others
+    warm_up = threading.Thread(target=oauth.load_sheets_client)
+    warm_up.start()
+    warm_up.join()
+    clients = []
+    threads = [threading.Thread(target=lambda: clients.append(oauth.authenticate_sheets())) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+    assert len(clients) == 2 and clients[0] is not clients[1]
+    assert clients[0]._http.credentials is clients[1]._http.credentials
@@ -0,0 +1,100 @@
+"""
+Author: Ayush Bhandari
+Email: ayushbhandariofficial@gmail.com
+"""
+from datetime import datetime
+from types import SimpleNamespace
+import pandas as pd
+import pytest
+from src.syncfunctions import reconcile
+from src.syncfunctions.reconcile import apply_changes
+
+OLD = datetime(2024, 1, 1)
+NEW = datetime(2024, 2, 1)
+
+
+def row_values(record_id, last_updated):
+    return {'id': record_id, 'first_name': f'first{record_id}', 'last_name': 'last', 'status': 'open',
+            'region': 'north', 'sales_rep': 'rep', 'follow_up': 'yes', 'notes': 'note',
+            'last_updated': last_updated}
+
+
+def sheets_frame(rows):
+    """Build a frame like fetch_sheets_rows() from {row_number: (id, last_updated)}."""
+    df = pd.DataFrame([row_values(*rows[row_number]) for row_number in rows])
+    df.index = [row_number - 2 for row_number in rows]
+    return df
+
+
+def postgres_frame(rows):
+    return pd.DataFrame([row_values(*row) for row in rows])
+
+
+@pytest.fixture
+def writers(monkeypatch):
+    """Stub every writer apply_changes uses, recording calls in order; append/upsert outcomes are configurable."""
+    state = SimpleNamespace(calls=[], append_fails=False, upsert_fails=False)
+
+    def upsert_postgres_record(record):
+        state.calls.append(('upsert_postgres', [record.id]))
+        return True
+
+    def upsert_postgres_records(records):
+        state.calls.append(('upsert_postgres', sorted(record.id for record in records)))
+        return not state.upsert_fails
+
+    def add_rows_to_sheets(records):
+        state.calls.append(('append_sheets', sorted(record.id for record in records)))
+        return [] if state.append_fails else [record.id for record in records]
+
+    def update_rows_in_sheets(rows):
+        state.calls.append(('update_sheets', sorted((row_number, record.id) for row_number, record in rows)))
+        return True
+
+    def delete_postgres_records(record_ids):
+        state.calls.append(('delete_postgres', sorted(record_ids)))
+        return True
+
+    def delete_rows_from_sheets(row_numbers):
+        state.calls.append(('delete_sheets', sorted(row_numbers)))
+        return True
+
+    for writer in (upsert_postgres_record, upsert_postgres_records, add_rows_to_sheets, update_rows_in_sheets,
+                   delete_postgres_records, delete_rows_from_sheets):
+        monkeypatch.setattr(reconcile, writer.__name__, writer)
+    return state
+
+
+def test_apply_changes_updates_postgres_newer_rows_in_one_call(writers):
+    sheets_df = sheets_frame({2: (1, OLD), 5: (2, OLD), 9: (3, NEW)})
+    postgres_df = postgres_frame([(1, NEW), (2, NEW), (3, OLD)])
+
+    apply_changes(sheets_df, postgres_df)
+
+    assert [call for call in writers.calls if call[0] == 'update_sheets'] == [('update_sheets', [(2, 1), (5, 2)])]
+
+
+def test_apply_changes_moves_one_sided_records_after_the_write_is_confirmed(writers):
+    # id 1 exists only in Sheets (row 4), id 2 only in PostgreSQL
+    apply_changes(sheets_frame({4: (1, NEW)}), postgres_frame([(2, NEW)]))
+
+    assert writers.calls == [('upsert_postgres', [1]), ('append_sheets', [2]), ('delete_postgres', [2]),
+                             ('delete_sheets', [4])]
+
+
+def test_apply_changes_keeps_postgres_rows_when_append_fails(writers):
+    writers.append_fails = True
+
+    apply_changes(sheets_frame({4: (1, NEW)}), postgres_frame([(2, NEW)]))
+
+    assert ('delete_postgres', [2]) not in writers.calls
+    assert ('delete_sheets', [4]) in writers.calls
+
+
+def test_apply_changes_keeps_sheets_rows_when_upsert_fails(writers):
+    writers.upsert_fails = True
+
+    apply_changes(sheets_frame({4: (1, NEW)}), postgres_frame([(2, NEW)]))
+
+    assert ('delete_sheets', [4]) not in writers.calls
+    assert ('delete_postgres', [2]) in writers.calls
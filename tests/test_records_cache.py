@@ -0,0 +1,38 @@
+"""
+Author: Ayush Bhandari
+Email: ayushbhandariofficial@gmail.com
+"""
+import pytest
+from src.utils import records_cache
+from src.utils.records_cache import bump_table_version, get_cached_response, store_cached_response, encoded_body
+
+
+@pytest.fixture
+def budget(monkeypatch):
+    monkeypatch.setattr(records_cache, 'MAX_CACHED_BYTES', 1000)
+    return bump_table_version()
+
+
+def test_oldest_entries_are_evicted_to_stay_within_the_byte_budget(budget):
+    for key in 'abc':
+        store_cached_response(key, budget, b'x' * 400)
+
+    assert [get_cached_response(key) is not None for key in 'abc'] == [False, True, True]
+
+
+def test_body_larger_than_the_budget_is_served_but_not_cached(budget):
+    cached = store_cached_response('big', budget, b'x' * 1001)
+
+    assert cached.body == b'x' * 1001
+    assert get_cached_response('big') is None
+
+
+def test_compressed_variants_count_towards_the_budget(budget):
+    store_cached_response('a', budget, b'a' * 400)
+    cached = store_cached_response('b', budget, bytes(range(256)) * 2)
+
+    gzipped = encoded_body(cached, 'gzip')
+
+    assert cached.encoded == {'gzip': gzipped}
+    assert get_cached_response('a') is None
+    assert get_cached_response('b') is cached
@@ -0,0 +1,24 @@
+"""
+Author: Ayush Bhandari
+Email: ayushbhandariofficial@gmail.com
+"""
+import json
+from datetime import datetime
+from src.utils.postgres_curd import RECORD_COLUMNS
+from src.utils.records_serializer import serialize_records, choose_encoding
+
+
+def test_serialize_records_with_table_columns():
+    row = (1, 'First', 'Last', 'Open', 'North', 'Rep', 'Call', 'Notes', datetime(2024, 1, 1, 12, 30))
+
+    body = serialize_records(RECORD_COLUMNS, [row])
+
+    assert json.loads(body) == [{'id': 1, 'first_name': 'First', 'last_name': 'Last', 'status': 'Open',
+                                 'region': 'North', 'sales_rep': 'Rep', 'follow_up': 'Call', 'notes': 'Notes',
+                                 'last_updated': '2024-01-01T12:30:00'}]
+
+
+def test_choose_encoding_wildcard_excludes_refused_codings():
+    assert choose_encoding('gzip;q=0, *') is None
+    assert choose_encoding('identity, *') == 'gzip'
+    assert choose_encoding('gzip;q=0.5') == 'gzip'
@@ -0,0 +1,154 @@
+"""
+Author: Ayush Bhandari
+Email: ayushbhandariofficial@gmail.com
+"""
+from datetime import datetime
+from types import SimpleNamespace
+import pandas as pd
+import pytest
+from src.syncfunctions import stream_sync
+from src.syncfunctions.stream_sync import plan_changes, apply_events, RECORD_FIELDS
+from src.datamodels.model import DataRecord
+
+OLD = datetime(2024, 1, 1)
+NEW = datetime(2024, 2, 1)
+
+
+def row_values(record_id, last_updated):
+    return {'id': record_id, 'first_name': f'first{record_id}', 'last_name': 'last', 'status': 'open',
+            'region': 'north', 'sales_rep': 'rep', 'follow_up': 'yes', 'notes': 'note',
+            'last_updated': last_updated}
+
+
+def postgres_row(record_id, last_updated):
+    values = row_values(record_id, last_updated)
+    return SimpleNamespace(id=record_id, last_updated=last_updated, _mapping=values)
+
+
+def make_record(record_id, last_updated=OLD):
+    return DataRecord(**row_values(record_id, last_updated))
+
+
+@pytest.fixture
+def sheet(monkeypatch):
+    """Stub the Sheets row fetch with {row_number: (id, last_updated)} and record what was fetched."""
+    rows = {}
+    fetched = []
+
+    def fetch_sheets_rows(row_numbers):
+        fetched.append(list(row_numbers))
+        df = pd.DataFrame([row_values(*rows[row_number]) for row_number in row_numbers],
+                          columns=['id'] + RECORD_FIELDS)
+        df.index = [row_number - 2 for row_number in row_numbers]
+        return df
+
+    monkeypatch.setattr(stream_sync, 'fetch_sheets_rows', fetch_sheets_rows)
+    return SimpleNamespace(rows=rows, fetched=fetched)
+
+
+@pytest.fixture
+def writers(monkeypatch):
+    """Stub every writer, recording calls in order; append/upsert outcomes are configurable."""
+    state = SimpleNamespace(calls=[], append_fails=False, upsert_fails=False)
+
+    def upsert_postgres_records(records):
+        state.calls.append(('upsert_postgres', [record.id for record in records]))
+        return not state.upsert_fails
+
+    def add_rows_to_sheets(records):
+        state.calls.append(('append_sheets', [record.id for record in records]))
+        return [] if state.append_fails else [record.id for record in records]
+
+    def update_rows_in_sheets(rows):
+        state.calls.append(('update_sheets', [row_number for row_number, _ in rows]))
+        return True
+
+    def delete_postgres_records(record_ids):
+        state.calls.append(('delete_postgres', list(record_ids)))
+        return True
+
+    def delete_rows_from_sheets(row_numbers):
+        state.calls.append(('delete_sheets', list(row_numbers)))
+        return True
+
+    for writer in (upsert_postgres_records, add_rows_to_sheets, update_rows_in_sheets, delete_postgres_records,
+                   delete_rows_from_sheets):
+        monkeypatch.setattr(stream_sync, writer.__name__, writer)
+    return state
+
+
+def test_plan_changes_merges_both_sides(sheet):
+    # id 1: Sheets only, 2: PostgreSQL only, 3: Sheets newer, 4: PostgreSQL newer, 5: unchanged
+    sheet.rows.update({2: (1, NEW), 3: (3, NEW), 4: (4, OLD), 5: (5, OLD)})
+    sheets_keys = iter([(1, 2, NEW), (3, 3, NEW), (4, 4, OLD), (5, 5, OLD)])
+    postgres_rows = iter([postgres_row(2, OLD), postgres_row(3, OLD), postgres_row(4, NEW), postgres_row(5, OLD)])
+
+    events = [(event, getattr(payload, 'id', payload)) for event, payload in plan_changes(sheets_keys, postgres_rows)]
+
+    assert events[:3] == [('append_sheets', 2), ('delete_postgres', 2), ('update_sheets', (4, make_record(4, NEW)))]
+    assert events[3:] == [('upsert_postgres', 1), ('delete_sheets', (2, 1)), ('upsert_postgres', 3)]
+    assert sheet.fetched == [[2, 3]]
+
+
+def test_plan_changes_fetches_sheets_rows_in_chunks(sheet):
+    sheet.rows.update({row_number: (row_number, NEW) for row_number in range(2, 7)})
+    sheets_keys = iter([(row_number, row_number, NEW) for row_number in range(2, 7)])
+
+    events = list(plan_changes(sheets_keys, iter([]), chunk_size=2))
+
+    assert sheet.fetched == [[2, 3], [4, 5], [6]]
+    assert [event for event, _ in events] == ['upsert_postgres', 'delete_sheets'] * 5
+
+
+def test_apply_events_appends_before_deleting_from_postgres(writers):
+    events = [('append_sheets', make_record(1)), ('delete_postgres', 1),
+              ('append_sheets', make_record(2)), ('delete_postgres', 2)]
+
+    counts = apply_events(events)
+
+    assert writers.calls == [('append_sheets', [1, 2]), ('delete_postgres', [1, 2]), ('delete_sheets', [])]
+    assert counts == {'append_sheets': 2, 'delete_postgres': 2}
+
+
+def test_apply_events_keeps_postgres_rows_when_append_fails(writers):
+    writers.append_fails = True
+
+    apply_events([('append_sheets', make_record(1)), ('delete_postgres', 1)])
+
+    assert ('delete_postgres', [1]) not in writers.calls
+    assert writers.calls == [('append_sheets', [1]), ('delete_sheets', [])]
+
+
+def test_apply_events_only_deletes_appended_ids(writers, monkeypatch):
+    # add_rows_to_sheets skips incomplete records and reports only what it appended
+    def add_rows_to_sheets(records):
+        writers.calls.append(('append_sheets', [record.id for record in records]))
+        return [record.id for record in records if record.notes]
+
+    monkeypatch.setattr(stream_sync, 'add_rows_to_sheets', add_rows_to_sheets)
+    incomplete = DataRecord(**{**row_values(2, OLD), 'notes': ''})
+
+    apply_events([('append_sheets', make_record(1)), ('delete_postgres', 1),
+                  ('append_sheets', incomplete), ('delete_postgres', 2)])
+
+    assert writers.calls == [('append_sheets', [1, 2]), ('delete_postgres', [1]), ('delete_sheets', [])]
+
+
+def test_apply_events_keeps_sheets_rows_when_upsert_fails(writers):
+    writers.upsert_fails = True
+
+    apply_events([('upsert_postgres', make_record(1)), ('delete_sheets', (2, 1))])
+
+    assert writers.calls == [('upsert_postgres', [1]), ('delete_sheets', [])]
+
+
+def test_apply_events_flushes_full_batches_and_deletes_sheets_rows_last(writers):
+    events = []
+    for record_id in range(1, 4):
+        events += [('upsert_postgres', make_record(record_id)), ('delete_sheets', (record_id + 1, record_id))]
+    events.append(('update_sheets', (9, make_record(9))))
+
+    apply_events(events, batch_size=2)
+
+    assert writers.calls == [('upsert_postgres', [1, 2]), ('upsert_postgres', [3]), ('update_sheets', [9]),
+                             ('delete_sheets', [2, 3, 4])]